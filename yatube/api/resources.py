@@ -0,0 +1,88 @@
+"""
+Описание полей ресурсов API.
+
+Каждое поле ответа связано с колонкой модели, в том числе через
+связи (author__username). Запрос строится через values() только
+по запрошенным колонкам: JOIN добавляется лишь для полей из связанных
+таблиц, а объекты моделей не создаются вовсе.
+"""
+from django.core.files.storage import default_storage
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class Resource:
+    def __init__(self, model, columns, ordering, default=None, files=()):
+        self.model = model
+        self.columns = columns
+        self.ordering = ordering
+        self.default = tuple(default or columns)
+        self.files = set(files)
+        self.keys = [name.lstrip('-') for name in ordering]
+
+    def fields(self, requested):
+        """
+        Имена полей из параметра ?fields=; ValueError для неизвестных.
+        """
+        if not requested:
+            return self.default
+        names = tuple(dict.fromkeys(
+            name.strip() for name in requested.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.columns]
+        if unknown or not names:
+            raise ValueError('Неизвестные поля: ' + ', '.join(unknown))
+        return names
+
+    def values(self, queryset, names):
+        """
+        Queryset словарей с колонками полей names и ключами сортировки.
+        """
+        columns = {self.columns[name] for name in names}
+        return queryset.values(*columns.union(self.keys))
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.columns[name]]
+            if name in self.files:
+                value = default_storage.url(value) if value else None
+            data[name] = value
+        return data
+
+
+POSTS = Resource(
+    Post,
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'thumbnail': 'thumbnail',
+        'comments_count': 'comments_count',
+    },
+    ordering=('-pub_date', '-id'),
+    default=('id', 'text', 'pub_date', 'author', 'group', 'comments_count'),
+    files=('image', 'thumbnail'),
+)
+
+GROUPS = Resource(
+    Group,
+    {'id': 'id', 'title': 'title', 'slug': 'slug',
+     'description': 'description'},
+    ordering=('id',),
+)
+
+COMMENTS = Resource(
+    Comment,
+    {'id': 'id', 'post': 'post_id', 'author': 'author__username',
+     'text': 'text', 'created': 'created'},
+    ordering=('created', 'id'),
+)
+
+FOLLOWS = Resource(
+    Follow,
+    {'id': 'id', 'user': 'user__username', 'author': 'author__username'},
+    ordering=('-id',),
+)
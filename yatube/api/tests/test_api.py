@@ -0,0 +1,118 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Follow, Comment
+
+
+@override_settings(API_PAGE_SIZE=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test',
+                                         description='Описание')
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group if i % 2 else None)
+        cls.post = Post.objects.latest('id')
+        Comment.objects.create(text='Комментарий', author=cls.user,
+                               post=cls.post)
+
+    def setUp(self):
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ApiTests.user)
+        self.author_client = Client()
+        self.author_client.force_login(ApiTests.author)
+        cache.clear()
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(url, json.dumps(data),
+                                       content_type='application/json')
+
+    def test_post_list_pages_and_fields(self):
+        url = reverse('api:post_list')
+        texts = []
+        cursor = ''
+        while True:
+            with self.assertNumQueries(1):
+                data = self.client.get(url, {'fields': 'text,author',
+                                             'cursor': cursor}).json()
+            for item in data['results']:
+                self.assertEqual(set(item), {'text', 'author'})
+                self.assertEqual(item['author'], 'admin2')
+            texts.extend(item['text'] for item in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(texts, [f'Пост {i}' for i in range(4, -1, -1)])
+
+    def test_filters_and_details(self):
+        data = self.client.get(reverse('api:post_list'),
+                               {'group': 'test', 'fields': 'id,group'}
+                               ).json()
+        self.assertEqual({item['group'] for item in data['results']},
+                         {'test'})
+        data = self.client.get(reverse('api:group_detail',
+                                       args=['test'])).json()
+        self.assertEqual(data['title'], 'Тест')
+        data = self.client.get(reverse(
+            'api:comment_list', args=[ApiTests.post.id])).json()
+        self.assertEqual(data['results'][0]['author'], 'admin1')
+        self.assertEqual(self.client.get(
+            reverse('api:post_detail', args=[9999])).status_code, 404)
+        response = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_edit_delete_post(self):
+        url = reverse('api:post_list')
+        self.assertEqual(self.send(self.client, 'post', url,
+                                   {'text': 'Аноним'}).status_code, 401)
+        response = self.send(self.authorized_client, 'post', url,
+                             {'text': 'Из API', 'group': 'test'})
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(created['group'], 'test')
+        self.assertEqual(created['author'], 'admin1')
+        self.assertEqual(self.send(self.authorized_client, 'post', url,
+                                   {'text': ''}).json()['errors'].keys(),
+                         {'text'})
+
+        detail = reverse('api:post_detail', args=[created['id']])
+        self.assertEqual(self.send(self.author_client, 'patch', detail,
+                                   {'text': 'Чужой'}).status_code, 403)
+        response = self.send(self.authorized_client, 'patch', detail,
+                             {'text': 'Исправлено', 'group': None})
+        self.assertEqual(response.json()['text'], 'Исправлено')
+        self.assertIsNone(Post.objects.get(pk=created['id']).group)
+        response = self.authorized_client.delete(detail)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=created['id']).exists())
+
+    def test_comments_and_follows(self):
+        url = reverse('api:comment_list', args=[ApiTests.post.id])
+        response = self.send(self.authorized_client, 'post', url,
+                             {'text': 'Ещё'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ApiTests.post.comments.count(), 2)
+
+        url = reverse('api:follow_list')
+        response = self.send(self.authorized_client, 'post', url,
+                             {'author': 'admin2'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.send(self.authorized_client, 'post', url,
+                                   {'author': 'admin1'}).status_code, 400)
+        data = self.authorized_client.get(url).json()
+        self.assertEqual([item['author'] for item in data['results']],
+                         ['admin2'])
+        response = self.authorized_client.delete(
+            reverse('api:follow_detail', args=['admin2']))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.client.get(url).status_code, 401)
@@ -0,0 +1,234 @@
+"""
+JSON API для постов, групп, комментариев и подписок.
+
+Списки листаются курсором (?cursor=, в ответе next_cursor), поля
+ответа выбираются параметром ?fields=id,text,author. Чтение открыто
+всем, запись — только вошедшим пользователям; запросы на запись,
+как и формы сайта, передают CSRF-токен в заголовке X-CSRFToken.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+
+from core.paginator import CursorPaginator
+from core.replicas import replica_reads
+from posts.forms import CommentForm, PostForm
+from posts.models import Follow, Group, Post, User
+
+from .resources import COMMENTS, FOLLOWS, GROUPS, POSTS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class _Encoder(json.JSONEncoder):
+    def default(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat().replace('+00:00', 'Z')
+        return super().default(value)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=_Encoder, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status,
+                        content_type='application/json')
+
+
+def error(message, status=400, errors=None):
+    data = {'error': message}
+    if errors:
+        data['errors'] = errors
+    return json_response(data, status)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def api_view(*methods):
+    """
+    Проверяет метод и вход для записи, превращает ошибки в JSON.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error('Метод не поддерживается', 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            if request.method != 'GET' and not request.user.is_authenticated:
+                return error('Требуется вход', 401)
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error('Не найдено', 404)
+            except ApiError as exc:
+                return error(str(exc), exc.status, exc.errors)
+        return wrapper
+    return decorator
+
+
+def _body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Некорректный JSON')
+    if not isinstance(data, dict):
+        raise ApiError('Ожидается JSON-объект')
+    return data
+
+
+def _fields(request, resource):
+    try:
+        return resource.fields(request.GET.get('fields'))
+    except ValueError as exc:
+        raise ApiError(str(exc))
+
+
+def _list(request, resource, queryset):
+    names = _fields(request, resource)
+    queryset = resource.values(queryset, names).order_by(*resource.ordering)
+    paginator = CursorPaginator(queryset,
+                                settings.API_PAGE_SIZE,
+                                ordering=resource.ordering)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [resource.serialize(row, names) for row in page],
+        'next_cursor': paginator.next_cursor,
+    })
+
+
+def _detail(request, resource, queryset, status=200, **lookup):
+    names = _fields(request, resource)
+    row = resource.values(queryset, names).filter(**lookup).first()
+    if row is None:
+        raise Http404
+    return json_response(resource.serialize(row, names), status)
+
+
+def _form_errors(form):
+    raise ApiError('Некорректные данные', errors={
+        field: [str(message) for message in messages]
+        for field, messages in form.errors.items()})
+
+
+def _group_id(data, default=None):
+    if 'group' not in data:
+        return default
+    if data['group'] is None:
+        return None
+    group = Group.objects.filter(slug=data['group']).first()
+    if group is None:
+        raise ApiError('Группа не найдена')
+    return group.pk
+
+
+@replica_reads
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        data = _body(request)
+        form = PostForm({'text': data.get('text'),
+                         'group': _group_id(data)})
+        if not form.is_valid():
+            _form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return _detail(request, POSTS, Post.objects, 201, pk=post.pk)
+    queryset = Post.objects.all()
+    if request.GET.get('author'):
+        queryset = queryset.filter(
+            author__username=request.GET['author'])
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    return _list(request, POSTS, queryset)
+
+
+@replica_reads
+@api_view('GET', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    if request.method == 'GET':
+        return _detail(request, POSTS, Post.objects, pk=post_id)
+    post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != request.user.pk:
+        raise ApiError('Изменять пост может только автор', 403)
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    data = _body(request)
+    form = PostForm({'text': data.get('text', post.text),
+                     'group': _group_id(data, post.group_id)},
+                    instance=post)
+    if not form.is_valid():
+        _form_errors(form)
+    form.save()
+    return _detail(request, POSTS, Post.objects, pk=post.pk)
+
+
+@replica_reads
+@api_view('GET')
+def groups(request):
+    return _list(request, GROUPS, Group.objects.all())
+
+
+@replica_reads
+@api_view('GET')
+def group_detail(request, slug):
+    return _detail(request, GROUPS, Group.objects, slug=slug)
+
+
+@replica_reads
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    if request.method == 'POST':
+        form = CommentForm({'text': _body(request).get('text')})
+        if not form.is_valid():
+            _form_errors(form)
+        comment = form.save(commit=False)
+        comment.post = post
+        comment.author = request.user
+        comment.save()
+        return _detail(request, COMMENTS, post.comments, 201,
+                       pk=comment.pk)
+    return _list(request, COMMENTS, post.comments.all())
+
+
+@api_view('GET', 'POST')
+def follows(request):
+    if not request.user.is_authenticated:
+        return error('Требуется вход', 401)
+    if request.method == 'POST':
+        author = get_object_or_404(User, username=_body(request).get(
+            'author'))
+        if author == request.user:
+            raise ApiError('Нельзя подписаться на себя')
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author)
+        return _detail(request, FOLLOWS, Follow.objects,
+                       201 if created else 200, pk=follow.pk)
+    return _list(request, FOLLOWS, request.user.follower.all())
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from . import sqlite
+
+        connection_created.connect(sqlite.configure,
+                                   dispatch_uid='core.sqlite.configure')
+        request_started.connect(sqlite.check_connections,
+                                dispatch_uid='core.sqlite.check')
+        if settings.TEMPLATE_CACHE:
+            from django.template import engines
+
+            for engine in engines.all():
+                if hasattr(engine, 'warm'):
+                    engine.warm()
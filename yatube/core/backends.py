@@ -0,0 +1,62 @@
+"""
+Шаблонный движок Django с замером времени рендеринга страниц
+и прогревом кэширующего загрузчика.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.backends import django
+from django.template.utils import get_app_template_dirs
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_render.observe(time.perf_counter() - start,
+                                            self.origin.template_name
+                                            or self.origin.name)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+    def template_names(self):
+        directories = list(self.engine.dirs) + list(
+            get_app_template_dirs('templates'))
+        names = set()
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.html'):
+                        path = os.path.relpath(os.path.join(root, name),
+                                               directory)
+                        names.add(path.replace(os.sep, '/'))
+        return sorted(names)
+
+    def warm(self):
+        """
+        Компилирует все шаблоны заранее. С кэширующим загрузчиком
+        они остаются в памяти, и первый запрос не тратит время на разбор.
+        """
+        compiled = 0
+        for name in self.template_names():
+            try:
+                self.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                logger.debug('Template %s not warmed: %s', name, error)
+                continue
+            compiled += 1
+        return compiled
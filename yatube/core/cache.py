@@ -0,0 +1,300 @@
+"""
+Общий кэш для всех процессов одного хоста в файле SQLite.
+
+В отличие от LocMemCache, запись одного воркера видна остальным,
+поэтому инвалидация и счётчики работают сразу во всех процессах.
+Поддерживаются TTL, вытеснение давно не читанных ключей (LRU),
+атомарный incr и версии ключей. Если файл кэша не открывается,
+операции выполняются в памяти процесса, как с LocMemCache. Ошибки
+открытого файла (например, блокировка дольше BUSY_TIMEOUT) в память
+не уходят: чтение считается промахом, а запись поднимает исключение,
+иначе сброс метки версии потерялся бы и другие процессы отдавали бы
+устаревшие данные.
+"""
+import functools
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB, expires REAL,'
+    ' accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+
+
+def _with_fallback(method):
+    """
+    Если файл кэша не открывается, выполняет операцию в кэше памяти
+    процесса.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            self._connection()
+        except sqlite3.Error as error:
+            logger.warning('Cache %s failed on %s: %s',
+                           method.__name__, self._location, error)
+            return getattr(self._fallback, method.__name__)(*args, **kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _miss_on_error(default):
+    """
+    Ошибку чтения из открытого файла считает промахом.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.Error as error:
+                logger.warning('Cache %s failed on %s: %s',
+                               method.__name__, self._location, error)
+                return default() if callable(default) else default
+        return wrapper
+    return decorator
+
+
+class SQLiteCache(BaseCache):
+    # Время последнего чтения обновляется не чаще раза в секунду,
+    # чтобы чтения почти не требовали блокировки на запись.
+    touch_interval = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._location = location
+        self._timeout = params.get('OPTIONS', {}).get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+        self._fallback = LocMemCache(location, params)
+
+    def _connection(self):
+        # Соединение своё у каждого потока и процесса: после fork
+        # соединение родителя использовать нельзя.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            directory = os.path.dirname(self._location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._location,
+                                         timeout=self._timeout,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._local.connection, self._local.pid = connection, pid
+        return self._local.connection
+
+    def _write(self, operation):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = operation(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _dump(value):
+        # Целые числа хранятся как есть, чтобы incr выполнялся в SQL.
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, bytes):
+            return pickle.loads(value)
+        return value
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @_with_fallback
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    @_with_fallback
+    @_miss_on_error(dict)
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT key, value, accessed FROM cache WHERE key IN (%s) '
+            'AND (expires IS NULL OR expires > ?)'
+            % ', '.join('?' * len(keys)),
+            [*keys, now],
+        ).fetchall()
+        stale = [key for key, _, accessed in rows
+                 if now - accessed >= self.touch_interval]
+        if stale:
+            try:
+                connection.execute(
+                    'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+                    % ', '.join('?' * len(stale)),
+                    [now, *stale],
+                )
+            except sqlite3.OperationalError:
+                # Время чтения нужно только для вытеснения, ждать
+                # блокировку ради него не стоит.
+                pass
+        return {keys[key]: self._load(value) for key, value, _ in rows}
+
+    @_with_fallback
+    @_miss_on_error(False)
+    def has_key(self, key, version=None):
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self._key(key, version), time.time()],
+        ).fetchone()
+        return row is not None
+
+    @_with_fallback
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    @_with_fallback
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [(self._key(key, version), self._dump(value), expires, now)
+                for key, value in data.items()]
+
+        def operation(connection):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)', rows)
+            self._cull(connection, now)
+
+        self._write(operation)
+        return []
+
+    @_with_fallback
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+
+        def operation(connection):
+            cursor = connection.execute(
+                'INSERT INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed '
+                'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                [key, self._dump(value), expires, now, now],
+            )
+            if cursor.rowcount:
+                self._cull(connection, now)
+            return bool(cursor.rowcount)
+
+        return self._write(operation)
+
+    @_with_fallback
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), now,
+             self._key(key, version), now],
+        )
+        return bool(cursor.rowcount)
+
+    @_with_fallback
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+
+        def operation(connection):
+            cursor = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                [delta, key, time.time()],
+            )
+            if not cursor.rowcount:
+                raise ValueError("Key '%s' not found" % key)
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', [key]).fetchone()[0]
+
+        return self._write(operation)
+
+    @_with_fallback
+    def incr_version(self, key, delta=1, version=None):
+        if version is None:
+            version = self.version
+        old_key = self._key(key, version)
+        new_key = self._key(key, version + delta)
+
+        def operation(connection):
+            connection.execute('DELETE FROM cache WHERE key = ?', [new_key])
+            cursor = connection.execute(
+                'UPDATE cache SET key = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [new_key, old_key, time.time()],
+            )
+            if not cursor.rowcount:
+                raise ValueError("Key '%s' not found" % key)
+            return version + delta
+
+        return self._write(operation)
+
+    @_with_fallback
+    def delete(self, key, version=None):
+        return bool(self.delete_many([key], version))
+
+    @_with_fallback
+    def delete_many(self, keys, version=None):
+        self._fallback.delete_many(keys, version)
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return 0
+        cursor = self._connection().execute(
+            'DELETE FROM cache WHERE key IN (%s)' % ', '.join('?' * len(keys)),
+            keys,
+        )
+        return cursor.rowcount
+
+    @_with_fallback
+    def clear(self):
+        self._fallback.clear()
+        self._connection().execute('DELETE FROM cache')
+
+    def _cull(self, connection, now):
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [now])
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if not self._cull_frequency:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            [count // self._cull_frequency],
+        )
+
+    def close(self, **kwargs):
+        # Соединение живёт дольше запроса: открывать файл заново
+        # на каждый запрос дороже, чем держать его открытым.
+        pass
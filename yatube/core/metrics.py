@@ -0,0 +1,301 @@
+"""
+Метрики процесса в формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса: наблюдение — это
+поиск корзины и пара сложений под блокировкой. Раз в
+METRICS_FLUSH_SECONDS процесс сбрасывает свои значения в файл
+METRICS_DIR/<pid>-<uuid>.json, а /metrics складывает файлы всех воркеров.
+
+Пока процесс жив, он держит flock на <pid>-<uuid>.lock: имя с uuid не
+совпадёт у процесса с тем же pid, а файл без блокировки принадлежит
+завершившемуся воркеру. Такие файлы /metrics вливает в aggregate.json
+и удаляет, поэтому счётчики не убывают, а каталог не растёт.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 20, 50)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def _labels(self, key):
+        if not key:
+            return ''
+        pairs = ','.join(
+            '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                             .replace('"', '\\"'))
+            for name, value in zip(self.labels, key))
+        return '{' + pairs + '}'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def merge(self, totals, values):
+        for key, value in values:
+            key = tuple(key)
+            totals[key] = totals.get(key, 0) + value
+
+    def exposition(self, values):
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{self._labels(key)} {value}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(labels)
+            if state is None:
+                # Последняя корзина — +Inf, затем сумма наблюдений.
+                state = self.values[labels] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def merge(self, totals, values):
+        for key, state in values:
+            key = tuple(key)
+            current = totals.setdefault(key, [0] * len(state))
+            for index, value in enumerate(state):
+                current[index] += value
+
+    def exposition(self, values):
+        for key, state in sorted(values.items()):
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',), state):
+                total += count
+                yield (f'{self.name}_bucket'
+                       f'{self._bucket_labels(key, bound)} {total}')
+            yield f'{self.name}_count{self._labels(key)} {total}'
+            yield f'{self.name}_sum{self._labels(key)} {state[-1]}'
+
+    def _bucket_labels(self, key, bound):
+        labels = self._labels(key)
+        le = f'le="{bound}"'
+        return '{' + (labels[1:-1] + ',' if labels else '') + le + '}'
+
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+def _register(metric):
+    return _metrics.setdefault(metric.name, metric)
+
+
+request_latency = _register(Histogram(
+    'yatube_request_duration_seconds', 'Время ответа по имени URL.',
+    ('view',)))
+request_queries = _register(Histogram(
+    'yatube_request_queries', 'SQL-запросов на запрос по имени URL.',
+    ('view',), buckets=QUERY_BUCKETS))
+template_render = _register(Histogram(
+    'yatube_template_render_seconds', 'Время рендеринга шаблона.',
+    ('template',)))
+cache_requests = _register(Counter(
+    'yatube_cache_requests_total', 'Попадания и промахи кэшей.',
+    ('layer', 'result')))
+
+
+def _snapshot():
+    with _lock:
+        return {name: [[list(key), value] for key, value in
+                       metric.values.items()]
+                for name, metric in _metrics.items()}
+
+
+AGGREGATE = 'aggregate'
+
+_last_flush = 0
+_worker = None
+
+
+class Worker:
+    """
+    Файлы текущего процесса: значения и блокировка, которая держится
+    до завершения процесса.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pid = os.getpid()
+        name = f'{self.pid}-{uuid.uuid4().hex}'
+        self.path = os.path.join(directory, name + '.json')
+        # Блокировка берётся до первой записи значений: файл значений
+        # без блокировки считается брошенным.
+        self.fd = os.open(os.path.join(directory, name + '.lock'),
+                          os.O_WRONLY | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _current_worker(directory):
+    global _worker
+    if _worker is not None and (_worker.directory, _worker.pid) == (
+            directory, os.getpid()):
+        return _worker
+    if _worker is not None and _worker.pid == os.getpid():
+        _worker.close()
+    _worker = Worker(directory)
+    return _worker
+
+
+def _write(path, snapshot):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(snapshot, target)
+    os.replace(temporary, path)
+
+
+def _read(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(force=False):
+    """
+    Записывает значения процесса в общий каталог, не чаще
+    METRICS_FLUSH_SECONDS, если не force.
+    """
+    global _last_flush
+    directory = settings.METRICS_DIR
+    now = time.monotonic()
+    if not directory or (
+            not force and now - _last_flush < settings.METRICS_FLUSH_SECONDS):
+        return
+    _last_flush = now
+    os.makedirs(directory, exist_ok=True)
+    with _lock:
+        worker = _current_worker(directory)
+    _write(worker.path, _snapshot())
+
+
+def _merged(snapshots):
+    totals = {name: {} for name in _metrics}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            if name in totals:
+                _metrics[name].merge(totals[name], values)
+    return totals
+
+
+def _abandoned(directory, name):
+    """
+    True, если процесс, писавший файл name, завершился.
+    """
+    try:
+        fd = os.open(os.path.join(directory, name + '.lock'), os.O_RDONLY)
+    except FileNotFoundError:
+        # Файл без блокировки: старый формат <pid>.json.
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+def _remove(directory, name):
+    for suffix in ('.json', '.lock'):
+        try:
+            os.remove(os.path.join(directory, name + suffix))
+        except FileNotFoundError:
+            pass
+
+
+def _compact(directory):
+    """
+    Вливает файлы завершившихся воркеров в aggregate.json.
+    Вызывается под блокировкой каталога.
+    """
+    path = os.path.join(directory, AGGREGATE + '.json')
+    aggregate = _read(path) or {'merged': [], 'metrics': {}}
+    # Упали между записью итога и удалением файлов: эти файлы уже
+    # учтены в итоге.
+    for name in aggregate['merged']:
+        _remove(directory, name)
+    names = [name[:-len('.json')] for name in os.listdir(directory)
+             if name.endswith('.json') and name != AGGREGATE + '.json']
+    dead = [name for name in names if _abandoned(directory, name)]
+    snapshots = [aggregate['metrics']]
+    for name in dead:
+        snapshot = _read(os.path.join(directory, name + '.json'))
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    if not dead:
+        return aggregate['metrics']
+    merged = {name: [[list(key), value] for key, value in values.items()]
+              for name, values in _merged(snapshots).items()}
+    _write(path, {'merged': dead, 'metrics': merged})
+    for name in dead:
+        _remove(directory, name)
+    return merged
+
+
+def _collected():
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [_snapshot()]
+    flush(force=True)
+    fd = os.open(os.path.join(directory, AGGREGATE + '.lock'),
+                 os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        # Один сбор за раз: иначе сбор может увидеть файл воркера
+        # и итог, в который его уже влили.
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        snapshots = [_compact(directory)]
+        for name in os.listdir(directory):
+            if name.endswith('.json') and name != AGGREGATE + '.json':
+                snapshot = _read(os.path.join(directory, name))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+    finally:
+        os.close(fd)
+    return snapshots
+
+
+def exposition():
+    """
+    Текст метрик всех воркеров в формате Prometheus.
+    """
+    totals = _merged(_collected())
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        lines.extend(metric.exposition(totals[name]))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,157 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, replicas
+from .profiling import Profile
+from .queries import QueryRecorder, budget_for, violations
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого запроса и сравнивает с бюджетом
+    из QUERY_BUDGETS по имени URL. При DEBUG отчёт отдаётся заголовком
+    X-Query-Report, иначе нарушения пишутся в лог. С QUERY_BUDGET_STRICT
+    превышение бюджета — ошибка.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        # Бюджеты задаются для чтения, записи проверяются только на N+1.
+        budget = budget_for(url_name) if request.method in (
+            'GET', 'HEAD') else None
+        report = recorder.report(budget)
+        report['url_name'] = url_name
+        problems = violations(report)
+        if settings.DEBUG:
+            response['X-Query-Report'] = json.dumps(report)
+        if problems:
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(
+                    f'{request.path}: ' + '; '.join(problems))
+            logger.warning('Query budget exceeded for %s: %s', url_name,
+                           '; '.join(problems),
+                           extra={'query_report': report})
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Включает чтение с реплики для представлений с replica_reads
+    и закрепляет пользователя за основной базой после записи.
+    """
+
+    WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.wrote_to_primary = False
+
+        def detect_write(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(self.WRITES):
+                request.wrote_to_primary = True
+            return execute(sql, params, many, context)
+
+        try:
+            with connections['default'].execute_wrapper(detect_write):
+                response = self.get_response(request)
+        finally:
+            replicas.use_replica(None)
+        if request.wrote_to_primary:
+            response.set_cookie(replicas.PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (getattr(view_func, 'replica_reads', False)
+                and request.method in ('GET', 'HEAD')
+                and replicas.PIN_COOKIE not in request.COOKIES):
+            replicas.use_replica(replicas.choose_replica())
+
+
+class ProfilerMiddleware:
+    """
+    Профилирует запрос, если передан заголовок X-Profile с токеном
+    PROFILER_TOKEN, сотрудник добавил к адресу ?profile=1 или запрос
+    попал в долю PROFILER_SAMPLE_RATE. Стеки пишутся в PROFILER_DIR,
+    разбивка времени — в заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def wanted(self, request):
+        token = settings.PROFILER_TOKEN
+        if token and request.META.get('HTTP_X_PROFILE') == token:
+            return True
+        if 'profile' in request.GET and request.user.is_staff:
+            return True
+        rate = settings.PROFILER_SAMPLE_RATE
+        return bool(rate) and random.random() < rate
+
+    def __call__(self, request):
+        if not self.wanted(request):
+            return self.get_response(request)
+        with Profile(settings.PROFILER_INTERVAL) as profile:
+            response = self.get_response(request)
+        match = request.resolver_match
+        name = match.url_name if match and match.url_name else 'unknown'
+        path = profile.save(settings.PROFILER_DIR, name)
+        response['Server-Timing'] = profile.server_timing()
+        logger.info('Profile of %s saved to %s', request.path, path)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Замеряет время ответа и число SQL-запросов по имени URL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(count))
+            response = self.get_response(request)
+        match = request.resolver_match
+        name = match.url_name if match and match.url_name else 'unknown'
+        metrics.request_latency.observe(time.perf_counter() - start, name)
+        metrics.request_queries.observe(queries[0], name)
+        metrics.flush()
+        return response
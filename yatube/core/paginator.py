@@ -0,0 +1,177 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+# Целые ключи курсора должны помещаться в INTEGER базы.
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+
+def dump_cursor(payload):
+    """
+    Непрозрачный курсор из JSON-совместимого значения.
+    """
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def load_cursor(cursor):
+    """
+    Значение курсора или None, если курсор пуст или испорчен.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def in_range(value):
+    """
+    False для целых вне INTEGER базы, остальные значения пропускает.
+    """
+    return not isinstance(value, int) or MIN_INT <= value <= MAX_INT
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничная навигация по ключу (keyset) вместо OFFSET.
+
+    Страница выбирается непрозрачным курсором с позицией последней
+    (или первой) записи соседней страницы, поэтому не нужен ни COUNT,
+    ни OFFSET, и глубокие страницы отдаются так же быстро, как первая.
+    Номер страницы условный: 1 — у первой страницы, 2 — у остальных.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def get_page(self, cursor):
+        values, backwards = self._decode(cursor)
+        rows = self._rows(self.object_list, values, backwards)
+        return self.page_from_rows(rows, values is not None, backwards)
+
+    def get_merged_page(self, cursor, sources, objects):
+        """
+        Страница из нескольких источников с тем же порядком ordering.
+        Один составной запрос берёт pk первых per_page + 1 строк после
+        курсора из каждого источника, каждый подзапрос идёт по своему
+        индексу. Строки objects с этими pk сливаются здесь, поэтому
+        сортируется не больше per_page + 1 строк на источник.
+        """
+        values, backwards = self._decode(cursor)
+        parts, params = [], []
+        for number, source in enumerate(sources):
+            queryset = self._window(source, values, backwards).values_list(
+                'pk', flat=True)[:self.per_page + 1]
+            sql, source_params = queryset.query.sql_with_params()
+            parts.append(f'SELECT * FROM ({sql}) AS source_{number}')
+            params.extend(source_params)
+        with connections[objects.db].cursor() as cursor:
+            cursor.execute(' UNION ALL '.join(parts), params)
+            pks = {row[0] for row in cursor.fetchall()}
+        rows = list(objects.filter(pk__in=pks).order_by()) if pks else []
+        for name in reversed(self._ordering(backwards)):
+            field = name.lstrip('-')
+            rows.sort(key=lambda row: getattr(row, field),
+                      reverse=name.startswith('-'))
+        return self.page_from_rows(rows[:self.per_page + 1],
+                                   values is not None, backwards)
+
+    def _window(self, queryset, values, backwards):
+        queryset = queryset.order_by(*self._ordering(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        return queryset
+
+    def _rows(self, queryset, values, backwards):
+        return list(self._window(queryset, values, backwards)[
+            :self.per_page + 1])
+
+    def page_from_rows(self, rows, after_cursor=False, backwards=False):
+        """
+        Страница из уже выбранных строк: до per_page + 1 записей
+        в порядке ordering (лишняя означает, что есть продолжение).
+        """
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = after_cursor, has_more
+        if rows:
+            if has_next:
+                self.next_cursor = self._encode(rows[-1], False)
+            if has_previous:
+                self.previous_cursor = self._encode(rows[0], True)
+        number = 2 if self.previous_cursor else 1
+        self._num_pages = number + 1 if self.next_cursor else number
+        return self._get_page(rows, number, self)
+
+    def _ordering(self, backwards):
+        if not backwards:
+            return self.ordering
+        return [name[1:] if name.startswith('-') else '-' + name
+                for name in self.ordering]
+
+    def _after(self, values, backwards):
+        return self._keyset([
+            (name.lstrip('-'), name.startswith('-') != backwards, value)
+            for name, value in zip(self.ordering, values)
+        ])
+
+    def _keyset(self, keys):
+        # (a, b) < (x, y)  ==  a <= x AND (a < x OR b < y):
+        # первое условие даёт базе диапазон по индексу.
+        name, descending, value = keys[0]
+        lookup = 'lt' if descending else 'gt'
+        strict = Q(**{f'{name}__{lookup}': value})
+        if len(keys) == 1:
+            return strict
+        return (Q(**{f'{name}__{lookup}e': value})
+                & (strict | Q(**{name: value}) & self._keyset(keys[1:])))
+
+    def _field(self, name):
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _encode(self, obj, backwards):
+        # Строки могут быть и объектами моделей, и словарями values().
+        if isinstance(obj, dict):
+            values = [obj[name] for name in self.fields]
+        else:
+            values = [getattr(obj, name) for name in self.fields]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in values]
+        return dump_cursor([int(backwards), values])
+
+    def _decode(self, cursor):
+        # Испорченный курсор открывает первую страницу.
+        try:
+            backwards, values = load_cursor(cursor)
+            values = [self._field(name).to_python(value)
+                      for name, value in zip(self.fields, values)]
+        except (ValueError, TypeError, OverflowError, ValidationError):
+            return None, False
+        if (len(values) != len(self.fields)
+                or not all(in_range(value) for value in values)):
+            return None, False
+        return values, bool(backwards)
@@ -0,0 +1,114 @@
+"""
+Сэмплирующий профайлер одного запроса.
+
+Отдельный поток раз в PROFILER_INTERVAL секунд снимает стек потока,
+обрабатывающего запрос. Стеки сохраняются в формате collapsed stacks
+(строка «кадр;кадр;кадр число»), который понимают flamegraph.pl
+и speedscope. Время запроса делится на базу (точно, по запросам),
+шаблоны, кэш и Python (по доле сэмплов).
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from .queries import QueryRecorder
+
+# Категория сэмпла — по самому глубокому кадру из этих модулей.
+CATEGORIES = (
+    ('db', ('django.db.',)),
+    ('cache', ('django.core.cache', 'core.cache')),
+    ('template', ('django.template', 'sorl.thumbnail')),
+)
+
+
+def _frame_label(frame):
+    module = frame.f_globals.get('__name__', '?')
+    name = frame.f_code.co_name
+    if module == 'django.template.base' and name == '_render':
+        origin = getattr(frame.f_locals.get('self'), 'origin', None)
+        template = getattr(origin, 'template_name', None)
+        if template:
+            return f'template:{template}'
+    return f'{module}:{name}'
+
+
+def _category(frame):
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        for category, prefixes in CATEGORIES:
+            if module.startswith(prefixes):
+                return category
+        frame = frame.f_back
+    return 'python'
+
+
+class Profile:
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.duration = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop,
+                                         name='profiler', daemon=True)
+        self._recorder = QueryRecorder()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._recorder.__enter__()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self._start
+        self._stop.set()
+        self._sampler.join()
+        self._recorder.__exit__(*exc_info)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            self.categories[_category(frame)] += 1
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def timings(self):
+        """
+        Время в секундах по категориям. Время базы измерено точно,
+        остальное делится по доле сэмплов вне базы.
+        """
+        db = min(self._recorder.duration, self.duration)
+        rest = self.duration - db
+        samples = {name: count for name, count in self.categories.items()
+                   if name != 'db'}
+        total = sum(samples.values())
+        timings = {'total': self.duration, 'db': db}
+        for name in ('template', 'cache', 'python'):
+            share = samples.get(name, 0) / total if total else 0
+            timings[name] = rest * share
+        if not total:
+            timings['python'] = rest
+        return timings
+
+    def server_timing(self):
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}'
+                         for name, seconds in self.timings().items())
+
+    def save(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(
+            directory, f'{stamp}-{name}-{uuid.uuid4().hex[:8]}.collapsed')
+        with open(path, 'w') as target:
+            for stack, count in self.stacks.most_common():
+                target.write(f'{stack} {count}\n')
+        return path
@@ -0,0 +1,111 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+_SUBQUERY = re.compile(r'^(CO-ROUTINE|MATERIALIZE) (\w+)$')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def shape(sql):
+    """
+    Форма запроса: SQL без литералов, чтобы одинаковые запросы
+    с разными параметрами группировались вместе.
+    """
+    sql = _LITERALS.sub('?', sql)
+    return _LISTS.sub('(?)', sql)
+
+
+class QueryRecorder:
+    """
+    Записывает все SQL-запросы ко всем базам внутри блока with.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _record(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def repeated(self, threshold=None):
+        """
+        Формы запросов, повторившиеся не меньше threshold раз (N+1).
+        """
+        if threshold is None:
+            threshold = settings.QUERY_REPEAT_THRESHOLD
+        shapes = Counter(shape(sql) for sql, _, _ in self.queries)
+        return [(sql, total) for sql, total in shapes.most_common()
+                if total >= threshold]
+
+    def report(self, budget=None):
+        return {
+            'queries': self.count,
+            'budget': budget,
+            'duration_ms': round(self.duration * 1000, 2),
+            'repeated': [{'sql': sql, 'count': total}
+                         for sql, total in self.repeated()],
+        }
+
+
+def budget_for(url_name):
+    return settings.QUERY_BUDGETS.get(url_name)
+
+
+def violations(report):
+    problems = []
+    if report['budget'] is not None and report['queries'] > report['budget']:
+        problems.append(
+            f"{report['queries']} queries over budget {report['budget']}")
+    for item in report['repeated']:
+        problems.append(f"{item['count']}x {item['sql']}")
+    return problems
+
+
+def plan_problems(sql, params, using='default'):
+    """
+    Проблемы плана запроса SQLite: сортировка во временном B-дереве
+    или полный просмотр таблицы без индекса.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not sql.lstrip().startswith('SELECT'):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+    # Просмотр результата подзапроса — не просмотр таблицы: сам
+    # подзапрос проверяется своими строками плана.
+    subqueries = {match.group(2) for match in map(_SUBQUERY.match, details)
+                  if match}
+    scans = [_FULL_SCAN.match(detail) for detail in details]
+    return [detail for detail, scan in zip(details, scans)
+            if 'USE TEMP B-TREE' in detail
+            or (scan and scan.group(1) not in subqueries)]
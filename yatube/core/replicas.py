@@ -0,0 +1,61 @@
+"""
+Чтение с реплик базы данных.
+
+Представления, помеченные replica_reads, на GET и HEAD читают с реплики,
+выбранной по весам из DATABASE_REPLICAS. Запись всегда идёт в основную
+базу. После запроса с записью ReplicaMiddleware ставит cookie, и
+REPLICA_PIN_SECONDS пользователь читает только из основной базы, чтобы
+видеть свои изменения, пока реплика догоняет.
+
+Локальный стенд — два файла SQLite:
+
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+    }
+    DATABASE_REPLICAS = {'replica': 1}
+"""
+import random
+import threading
+
+from django.conf import settings
+
+PIN_COOKIE = 'primary_pin'
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    view.replica_reads = True
+    return view
+
+
+def choose_replica():
+    aliases = list(settings.DATABASE_REPLICAS)
+    weights = list(settings.DATABASE_REPLICAS.values())
+    return random.choices(aliases, weights=weights)[0]
+
+
+def current_replica():
+    return getattr(_state, 'replica', None)
+
+
+def use_replica(alias):
+    _state.replica = alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема на реплики приходит репликацией.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,65 @@
+"""
+Настройка соединений SQLite.
+
+Каждое новое соединение получает прагмы из SQLITE_PRAGMAS: WAL, чтобы
+чтения не ждали записи, synchronous=NORMAL (в WAL надёжно при падении
+процесса), mmap и кэш страниц побольше, ожидание блокировки вместо
+мгновенной ошибки и временные таблицы в памяти.
+
+При CONN_MAX_AGE соединения переживают запрос, поэтому перед запросом
+они проверяются: соединение SQLite закрывается, если файл базы
+подменили (восстановление из копии) или процесс форкнулся, остальные —
+если не отвечают.
+"""
+import os
+
+from django.conf import settings
+from django.db import connections
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """
+    Выполняет прагмы курсором DB-API, годится и для sqlite3 напрямую.
+    """
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _identity(connection):
+    if connection.is_in_memory_db():
+        return None
+    try:
+        stat = os.stat(connection.settings_dict['NAME'])
+    except OSError:
+        return (os.getpid(), None, None)
+    return (os.getpid(), stat.st_dev, stat.st_ino)
+
+
+def configure(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Курсор сырого соединения: настройка соединения не должна
+    # попадать в execute_wrapper — бюджеты запросов, профайлер, метрики.
+    cursor = connection.connection.cursor()
+    try:
+        apply_pragmas(cursor)
+    finally:
+        cursor.close()
+    connection.sqlite_identity = _identity(connection)
+
+
+def healthy(connection):
+    if connection.vendor != 'sqlite':
+        return connection.is_usable()
+    identity = getattr(connection, 'sqlite_identity', None)
+    return identity is None or identity == _identity(connection)
+
+
+def check_connections(**kwargs):
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not healthy(connection):
+            connection.close()
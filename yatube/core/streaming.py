@@ -0,0 +1,45 @@
+"""
+Потоковая отдача страниц со списками.
+
+Страница рендерится один раз с пустым списком и меткой на месте
+цикла. Всё до метки уходит клиенту сразу, затем по одной карточке
+на запись, затем остаток страницы. Записи читаются через
+iterator(chunk_size), поэтому память не растёт с длиной списка.
+"""
+from django.core.paginator import Page
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+MARKER = '<!-- stream -->'
+
+
+def _rows(items, chunk_size):
+    if hasattr(items, 'iterator'):
+        return items.iterator(chunk_size=chunk_size)
+    return iter(items)
+
+
+def stream_page(request, template_name, context, page, item_template,
+                item_name='post', chunk_size=100):
+    """
+    StreamingHttpResponse для шаблона ленты. Шаблон выводит
+    {{ stream_marker }} перед циклом по page, карточка рендерится
+    шаблоном item_template с переменными item_name и user.
+    """
+    empty = Page([], page.number, page.paginator)
+    html = render_to_string(
+        template_name,
+        dict(context, page=empty, stream_marker=mark_safe(MARKER)),
+        request)
+    head, tail = html.split(MARKER, 1)
+    item = get_template(item_template)
+    user = request.user
+
+    def content():
+        yield head
+        for obj in _rows(page.object_list, chunk_size):
+            yield item.render({item_name: obj, 'user': user})
+        yield tail
+
+    return StreamingHttpResponse(content())
@@ -0,0 +1,31 @@
+from urllib.parse import urlparse
+
+from django.urls import resolve
+
+from .queries import QueryRecorder, budget_for, plan_problems, violations
+
+
+class QueryBudgetMixin:
+    """
+    Проверка бюджета SQL-запросов страницы для тестов.
+    """
+
+    def assertQueryBudget(self, client, url):
+        with QueryRecorder() as recorder:
+            response = client.get(url)
+        url_name = resolve(urlparse(url).path).url_name
+        problems = violations(recorder.report(budget_for(url_name)))
+        if problems:
+            self.fail(f'{url}: ' + '; '.join(problems))
+        return response
+
+    def assertIndexedQueries(self, client, url):
+        with QueryRecorder() as recorder:
+            response = client.get(url)
+        problems = []
+        for sql, params, _ in recorder.queries:
+            problems.extend(f'{detail}: {sql}'
+                            for detail in plan_problems(sql, params))
+        if problems:
+            self.fail(f'{url}: ' + '; '.join(problems))
+        return response
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from .metrics import exposition
+
+
+def _may_scrape(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') == f'Bearer {token}':
+        return True
+    return request.user.is_staff
+
+
+def metrics(request):
+    if not _may_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(exposition(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,411 @@
+"""
+Нагрузочный прогон представлений posts на большом наборе данных.
+
+seed() заполняет базу пакетными вставками, run() гоняет представления
+через тестовый клиент и считает задержки, запросы к базе и пик памяти,
+compare() сравнивает результат с сохранённым базовым прогоном,
+render_cost() меряет стоимость рендеринга одной карточки ленты,
+sqlite_throughput() — пропускную способность SQLite на чтение
+и запись с настройками соединений и без них.
+Запускается командой benchmark на отдельной тестовой базе.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.template import Context
+from django.template.backends.django import DjangoTemplates
+from django.test import Client
+from django.urls import reverse
+
+from core.queries import QueryRecorder
+from core.sqlite import apply_pragmas
+
+from . import counters, hot, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+WORDS = ('пост', 'новость', 'город', 'фото', 'день', 'лето', 'книга',
+         'музыка', 'кино', 'погода', 'дорога', 'кофе', 'python', 'django')
+
+VIEWS = ('index', 'group_posts', 'profile', 'post', 'follow_index',
+         'hot', 'new_post', 'add_comment')
+
+# Метрики, рост которых считается регрессией.
+COMPARED = ('p95_ms', 'queries')
+
+INCLUDE_LOOP = ('{% for post in page %}'
+                '{% include "posts/post_item.html" with post=post %}'
+                '{% endfor %}')
+TAG_LOOP = ('{% load post_cards %}{% load_cards page %}'
+            '{% for post in page %}{% post_item post %}{% endfor %}')
+
+
+def _text(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _skewed(rng, items, count, skew):
+    """
+    Выборка с весами 1 / rank ** skew: немногие популярные элементы
+    получают большую часть выборки, как авторы в реальном графе подписок.
+    """
+    weights = [1 / (rank ** skew) for rank in range(1, len(items) + 1)]
+    return rng.choices(items, weights=weights, k=count)
+
+
+def seed(users=200, groups=10, posts=5000, comments=10000,
+         follows_per_user=20, skew=1.2, batch_size=500, random_seed=1):
+    """
+    Заполняет базу, обходя сигналы, и затем строит производные данные:
+    счётчики, ленты подписок и поисковый индекс.
+    """
+    rng = random.Random(random_seed)
+    User.objects.bulk_create(
+        [User(username=f'bench{i}') for i in range(users)],
+        batch_size=batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith='bench').order_by('id').values_list(
+            'id', flat=True))
+    Group.objects.bulk_create(
+        [Group(title=f'Группа {i}', slug=f'bench-{i}',
+               description=_text(rng)) for i in range(groups)],
+        batch_size=batch_size)
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-').values_list('id', flat=True))
+
+    authors = _skewed(rng, user_ids, posts, skew)
+    Post.objects.bulk_create(
+        (Post(text=_text(rng), author_id=author_id,
+              group_id=rng.choice(group_ids + [None]))
+         for author_id in authors),
+        batch_size=batch_size)
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(text=_text(rng, 6), author_id=rng.choice(user_ids),
+                 post_id=post_id)
+         for post_id in _skewed(rng, post_ids, comments, skew)),
+        batch_size=batch_size)
+
+    follows = set()
+    for user_id in user_ids:
+        for author_id in _skewed(rng, user_ids, follows_per_user, skew):
+            if author_id != user_id:
+                follows.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follows],
+        batch_size=batch_size)
+
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in user_ids],
+        batch_size=batch_size, ignore_conflicts=True)
+    counters.recount()
+    # Счётчики групп считаются при первом чтении; прогрев, чтобы
+    # замер group_posts не включал этот разовый пересчёт.
+    for group_id in group_ids:
+        counters.group_stats_for(group_id)
+    timeline.rebuild()
+    search.rebuild()
+    hot.rebuild()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments,
+        'follows': len(follows),
+    }
+
+
+class _Targets:
+    """
+    Случайные адреса и данные для каждого представления.
+    """
+
+    def __init__(self, rng, skew):
+        self.rng = rng
+        self.skew = skew
+        self.users = list(User.objects.values_list('id', 'username'))
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.posts = list(Post.objects.values_list(
+            'id', 'author__username').order_by('-id')[:1000])
+
+    def user(self):
+        return _skewed(self.rng, self.users, 1, self.skew)[0]
+
+    def post(self):
+        return self.rng.choice(self.posts)
+
+    def request(self, view):
+        if view == 'index':
+            return 'get', reverse('index'), None
+        if view == 'group_posts':
+            slug = self.rng.choice(self.groups)
+            return 'get', reverse('group_posts', args=[slug]), None
+        if view == 'profile':
+            return 'get', reverse('profile', args=[self.user()[1]]), None
+        if view == 'follow_index':
+            return 'get', reverse('follow_index'), None
+        if view == 'hot':
+            return 'get', reverse('hot'), None
+        if view == 'new_post':
+            return 'post', reverse('new_post'), {'text': _text(self.rng)}
+        post_id, username = self.post()
+        if view == 'post':
+            return 'get', reverse('post', args=[username, post_id]), None
+        return ('post', reverse('add_comment', args=[username, post_id]),
+                {'text': _text(self.rng, 6)})
+
+
+def percentile(values, fraction):
+    """
+    Перцентиль по ближайшему рангу.
+    """
+    ordered = sorted(values)
+    index = max(0, int(round(fraction * len(ordered))) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _clients(targets, count):
+    clients = []
+    for _ in range(count):
+        client = Client()
+        client.force_login(User.objects.get(pk=targets.user()[0]))
+        clients.append(client)
+    return clients
+
+
+def _call(client, method, url, data):
+    if method == 'get':
+        return client.get(url)
+    return client.post(url, data)
+
+
+def run(views=VIEWS, requests=100, warmup=5, memory_samples=3, clients=10,
+        skew=1.2, random_seed=1):
+    """
+    Прогоняет представления и возвращает метрики по каждому из них.
+    Пик памяти меряется отдельными запросами: tracemalloc замедляет
+    выполнение и исказил бы задержки.
+    """
+    rng = random.Random(random_seed)
+    targets = _Targets(rng, skew)
+    pool = _clients(targets, clients)
+    results = {}
+    for view in views:
+        for _ in range(warmup):
+            _call(rng.choice(pool), *targets.request(view))
+
+        latencies, queries, errors = [], [], 0
+        for _ in range(requests):
+            client = rng.choice(pool)
+            method, url, data = targets.request(view)
+            with QueryRecorder() as recorder:
+                start = time.perf_counter()
+                response = _call(client, method, url, data)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            if response.status_code >= 400:
+                errors += 1
+
+        peaks = []
+        for _ in range(memory_samples):
+            client = rng.choice(pool)
+            request = targets.request(view)
+            tracemalloc.start()
+            try:
+                _call(client, *request)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+        results[view] = {
+            'requests': requests,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+            'peak_kb': round(max(peaks, default=0) / 1024, 1),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Регрессии относительно базового прогона: метрики COMPARED,
+    выросшие больше чем на tolerance.
+    """
+    regressions = []
+    for view, metrics in results.items():
+        before = baseline.get(view)
+        if not before:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append({'view': view, 'metric': metric,
+                                    'baseline': old, 'current': new})
+    return regressions
+
+
+def _engine(cached):
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return DjangoTemplates({
+        'NAME': 'benchmark', 'DIRS': [settings.TEMPLATES_DIR],
+        'APP_DIRS': False, 'OPTIONS': {'loaders': loaders},
+    }).engine
+
+
+def render_cost(cards=20, rounds=50):
+    """
+    Микросекунды на карточку ленты: цикл с include без кэширующего
+    загрузчика (как при DEBUG), тот же цикл с кэшем и цикл с тегами
+    load_cards и post_item, как в шаблонах лент.
+    """
+    page = list(Post.objects.select_related('author', 'group')[:cards])
+    uncached, cached = _engine(False), _engine(True)
+    modes = {
+        'uncached_include': uncached.from_string(INCLUDE_LOOP),
+        'cached_include': cached.from_string(INCLUDE_LOOP),
+        'cached_tag': cached.from_string(TAG_LOOP),
+    }
+    context = {'page': page, 'user': AnonymousUser()}
+    results = {}
+    for mode, template in modes.items():
+        # Первый проход заполняет кэш карточек и загрузчика.
+        template.render(Context(context))
+        start = time.perf_counter()
+        for _ in range(rounds):
+            template.render(Context(context))
+        elapsed = time.perf_counter() - start
+        results[mode] = round(
+            elapsed / (rounds * max(len(page), 1)) * 1e6, 1)
+    return results
+
+
+_READ_POSTS = (
+    'SELECT p.id, p.text, p.pub_date, u.username FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id '
+    'ORDER BY p.pub_date DESC, p.id DESC LIMIT 10')
+_READ_COMMENTS = (
+    'SELECT id, text, created, author_id FROM posts_comment '
+    'WHERE post_id = ? ORDER BY created, id LIMIT 20')
+_WRITE_COMMENT = (
+    'INSERT INTO posts_comment (text, created, author_id, post_id) '
+    "VALUES (?, datetime('now'), ?, ?)")
+_COUNT_COMMENT = (
+    'UPDATE posts_post SET comments_count = comments_count + 1 '
+    'WHERE id = ?')
+
+
+def _connect(path, tuned):
+    database = sqlite3.connect(path, isolation_level=None,
+                               check_same_thread=False)
+    if tuned:
+        apply_pragmas(database)
+    return database
+
+
+def _worker(path, tuned, write, deadline, ids, rng, totals, lock):
+    post_ids, user_ids = ids
+    done = busy = 0
+    database = None
+    while time.perf_counter() < deadline:
+        if database is None:
+            database = _connect(path, tuned)
+        post_id = rng.choice(post_ids)
+        try:
+            if write:
+                database.execute('BEGIN IMMEDIATE')
+                database.execute(_WRITE_COMMENT, (
+                    _text(rng, 6), rng.choice(user_ids), post_id))
+                database.execute(_COUNT_COMMENT, (post_id,))
+                database.execute('COMMIT')
+            else:
+                database.execute(_READ_POSTS).fetchall()
+                database.execute(_READ_COMMENTS, (post_id,)).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            if database.in_transaction:
+                database.execute('ROLLBACK')
+            busy += 1
+        if not tuned:
+            # Как при CONN_MAX_AGE = 0: новое соединение на запрос.
+            database.close()
+            database = None
+    if database is not None:
+        database.close()
+    with lock:
+        totals['writes' if write else 'reads'] += done
+        totals['busy'] += busy
+
+
+def _copy_tables(path, models):
+    # backup() и ATTACH ждут конца транзакции, а прогон в тестах идёт
+    # внутри неё, поэтому таблицы переносятся запросами.
+    tables = [model._meta.db_table for model in models]
+    target = sqlite3.connect(path, isolation_level=None)
+    target.execute('BEGIN')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND '
+            f"tbl_name IN ({', '.join('%s' for _ in tables)}) "
+            "ORDER BY type = 'index'", tables)
+        for sql, in cursor.fetchall():
+            target.execute(sql)
+        for table in tables:
+            cursor.execute(f'SELECT * FROM {table}')
+            rows = cursor.fetchall()
+            if rows:
+                marks = ', '.join('?' for _ in rows[0])
+                target.executemany(
+                    f'INSERT INTO {table} VALUES ({marks})', rows)
+    target.execute('COMMIT')
+    target.close()
+
+
+def sqlite_throughput(seconds=2.0, readers=4, writers=2, random_seed=1):
+    """
+    Чтения и записи в секунду по постам и комментариям на файловой
+    копии базы прогона: без настроек с новым соединением на каждую
+    операцию и с SQLITE_PRAGMAS на постоянных соединениях.
+    """
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    user_ids = list(User.objects.values_list('id', flat=True))
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('default', 'tuned'):
+            path = os.path.join(directory, f'{mode}.sqlite3')
+            _copy_tables(path, (User, Post, Comment))
+            totals = {'reads': 0, 'writes': 0, 'busy': 0}
+            lock = threading.Lock()
+            deadline = time.perf_counter() + seconds
+            threads = [
+                threading.Thread(target=_worker, args=(
+                    path, mode == 'tuned', index < writers, deadline,
+                    (post_ids, user_ids),
+                    random.Random(random_seed + index), totals, lock))
+                for index in range(readers + writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[mode] = {
+                'reads_per_s': round(totals['reads'] / seconds),
+                'writes_per_s': round(totals['writes'] / seconds),
+                'busy': totals['busy'],
+            }
+    return results
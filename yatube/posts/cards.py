@@ -0,0 +1,96 @@
+"""
+Кэш отрендеренных карточек постов.
+
+Ключ карточки состоит из id поста и меток версий поста, группы и автора.
+Сигналы меняют метку, и все ленты сразу получают свежую карточку, а
+старая просто устаревает в кэше. Всё, что зависит от текущего
+пользователя, рендерится вне карточки.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import metrics
+
+CARD_TEMPLATE = 'posts/post_card.html'
+
+
+def _version_key(kind, pk):
+    return f'card_version:{kind}:{pk}'
+
+
+def bump(kind, pk):
+    bump_many(kind, [pk])
+
+
+def bump_many(kind, pks):
+    cache.set_many({_version_key(kind, pk): uuid4().hex
+                    for pk in pks if pk is not None}, None)
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Метка пропала из кэша: заводим новую, чтобы не взять
+            # карточку, сохранённую под старой меткой.
+            cache.add(key, uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def _version_keys(post):
+    keys = [_version_key('post', post.pk),
+            _version_key('author', post.author_id)]
+    if post.group_id is not None:
+        keys.append(_version_key('group', post.group_id))
+    return keys
+
+
+def _card_key(post, versions):
+    return ':'.join(['post_card', str(post.pk)]
+                    + [versions[key] for key in _version_keys(post)])
+
+
+def card_key(post):
+    return _card_key(post, _versions(_version_keys(post)))
+
+
+def _render(post):
+    if post.image:
+        # Без готовой миниатюры карточка выводится с заглушкой.
+        metrics.cache_requests.inc(
+            'thumbnail', 'hit' if post.thumbnail else 'miss')
+    return render_to_string(CARD_TEMPLATE, {
+        'post': post, 'thumbnail_size': settings.POST_THUMBNAIL_SIZE})
+
+
+def render_cards(posts):
+    """
+    Карточки постов страницы, {id поста: html}: метки версий и сами
+    карточки читаются из кэша одним get_many, новые пишутся одним
+    set_many.
+    """
+    posts = list(posts)
+    versions = _versions(list({key for post in posts
+                               for key in _version_keys(post)}))
+    keys = {post.pk: _card_key(post, versions) for post in posts}
+    cached = cache.get_many(list(keys.values()))
+    cards, fresh = {}, {}
+    for post in posts:
+        key = keys[post.pk]
+        if key in cached:
+            metrics.cache_requests.inc('card', 'hit')
+            cards[post.pk] = cached[key]
+            continue
+        metrics.cache_requests.inc('card', 'miss')
+        cards[post.pk] = fresh[key] = _render(post)
+    if fresh:
+        cache.set_many(fresh, settings.POST_CARD_TIMEOUT)
+    return cards
+
+
+def render_card(post):
+    return render_cards([post])[post.pk]
@@ -0,0 +1,192 @@
+"""
+Денормализованные счётчики комментариев, постов, подписок и групп.
+
+Счётчики меняются F-выражениями в сигналах. Строка UserStats
+создаётся при первом чтении с точным пересчётом, поэтому сигналы только
+обновляют уже существующие строки. GroupStats заводится вместе
+с группой; если строки нет (сброс после загрузки), она так же
+пересчитывается при чтении.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (Comment, Follow, GroupAuthor, GroupStats, Post,
+                     UserStats)
+
+
+def _count(model, field):
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+STATS_COUNTS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def stats_annotations():
+    return {name: _count(model, field)
+            for name, (model, field) in STATS_COUNTS.items()}
+
+
+def stats_for(user_id):
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                name: model.objects.filter(**{field: user_id}).count()
+                for name, (model, field) in STATS_COUNTS.items()
+            },
+        )
+    return stats
+
+
+def _bump(user_id, **deltas):
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def post_added(post, delta=1):
+    _bump(post.author_id, posts_count=delta)
+
+
+def comment_added(comment, delta=1):
+    if comment.post_id is not None:
+        Post.objects.filter(pk=comment.post_id).update(
+            comments_count=F('comments_count') + delta)
+
+
+def follow_added(follow, delta=1):
+    _bump(follow.author_id, followers_count=delta)
+    _bump(follow.user_id, following_count=delta)
+
+
+def group_created(group):
+    GroupStats.objects.get_or_create(group=group)
+
+
+def group_stats_for(group_id):
+    stats = GroupStats.objects.filter(group_id=group_id).first()
+    if stats is None:
+        with transaction.atomic():
+            authors = dict(
+                Post.objects.filter(group_id=group_id).order_by()
+                .values('author_id').annotate(total=Count('pk'))
+                .values_list('author_id', 'total'))
+            GroupAuthor.objects.filter(group_id=group_id).delete()
+            GroupAuthor.objects.bulk_create(
+                [GroupAuthor(group_id=group_id, author_id=author_id,
+                             posts_count=total)
+                 for author_id, total in authors.items()],
+                batch_size=500)
+            stats, _ = GroupStats.objects.get_or_create(
+                group_id=group_id,
+                defaults={'posts_count': sum(authors.values()),
+                          'authors_count': len(authors)},
+            )
+    return stats
+
+
+def group_post_added(group_id, author_id, delta=1):
+    """
+    Пост автора пришёл в группу (delta=1) или ушёл из неё (delta=-1).
+    """
+    if group_id is None or not GroupStats.objects.filter(
+            group_id=group_id).update(posts_count=F('posts_count') + delta):
+        return
+    authors = GroupAuthor.objects.filter(group_id=group_id,
+                                         author_id=author_id)
+    if delta > 0:
+        if not authors.update(posts_count=F('posts_count') + 1):
+            GroupAuthor.objects.create(group_id=group_id,
+                                       author_id=author_id, posts_count=1)
+            GroupStats.objects.filter(group_id=group_id).update(
+                authors_count=F('authors_count') + 1)
+        return
+    authors.update(posts_count=F('posts_count') - 1)
+    if authors.filter(posts_count=0).delete()[0]:
+        GroupStats.objects.filter(group_id=group_id).update(
+            authors_count=F('authors_count') - 1)
+
+
+def reset_group_stats(group_ids):
+    """
+    Сбрасывает счётчики групп: они пересчитаются при следующем чтении.
+    """
+    GroupAuthor.objects.filter(group_id__in=group_ids).delete()
+    return GroupStats.objects.filter(group_id__in=group_ids).delete()[0]
+
+
+def imported(posts=(), comments=(), follows=()):
+    """
+    Обновляет счётчики после пакетной вставки, минуя сигналы.
+    """
+    deltas = defaultdict(Counter)
+    for post in posts:
+        deltas[post.author_id]['posts_count'] += 1
+    reset_group_stats({post.group_id for post in posts
+                       if post.group_id is not None})
+    for follow in follows:
+        deltas[follow.author_id]['followers_count'] += 1
+        deltas[follow.user_id]['following_count'] += 1
+    for user_id, counts in deltas.items():
+        _bump(user_id, **counts)
+    _comments_changed(Counter(comment.post_id for comment in comments
+                              if comment.post_id is not None))
+
+
+def comments_removed(comments):
+    """
+    Вычитает комментарии queryset из счётчиков их постов, возвращает
+    id постов.
+    """
+    per_post = dict(comments.exclude(post=None).order_by().values(
+        'post_id').annotate(total=Count('pk')).values_list(
+            'post_id', 'total'))
+    _comments_changed({post_id: -total
+                       for post_id, total in per_post.items()})
+    return set(per_post)
+
+
+def _comments_changed(per_post):
+    for post_id, total in per_post.items():
+        Post.objects.filter(pk=post_id).update(
+            comments_count=F('comments_count') + total)
+
+
+def recount():
+    """
+    Пересчитывает все счётчики, возвращает число исправленных строк.
+    """
+    fixed = Post.objects.exclude(
+        comments_count=_count(Comment, 'post')
+    ).update(comments_count=_count(Comment, 'post'))
+    annotations = stats_annotations()
+    in_sync = Q()
+    for name in annotations:
+        in_sync &= Q(**{name: F('real_' + name)})
+    stale = list(
+        UserStats.objects.annotate(
+            **{'real_' + name: value for name, value in annotations.items()}
+        ).exclude(in_sync).values_list('pk', flat=True)
+    )
+    if stale:
+        fixed += UserStats.objects.filter(pk__in=stale).update(**annotations)
+    authors = (Post.objects.filter(group=OuterRef('pk')).order_by()
+               .values('group').annotate(total=Count('author', distinct=True))
+               .values('total'))
+    stale = GroupStats.objects.annotate(
+        real_posts=_count(Post, 'group'),
+        real_authors=Coalesce(Subquery(authors,
+                                       output_field=IntegerField()), 0),
+    ).exclude(posts_count=F('real_posts'), authors_count=F('real_authors'))
+    fixed += reset_group_stats(list(stale.values_list('pk', flat=True)))
+    return fixed
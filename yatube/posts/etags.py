@@ -0,0 +1,121 @@
+"""
+Валидаторы условных GET-запросов для лент и страницы поста.
+
+У каждой страницы свои метки времени в общем кэше: общая лента
+(index), группа (group:<slug>), автор (author:<username>) и пост
+(post:<id> — меняется и с каждым комментарием). Сигналы обновляют
+только метки затронутых страниц; метка SITE — для редких изменений,
+видных везде (переименование автора или группы, загрузка). ETag
+собирается из меток страницы, пользователя, адреса и CSRF-cookie,
+поэтому ответ 304 не требует ни рендера, ни запросов к базе.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from .models import Post, User
+
+SITE = 'site'
+INDEX = 'index'
+
+
+def group(slug):
+    return f'group:{slug}'
+
+
+def author(username):
+    return f'author:{username}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def _key(scope):
+    return f'changed_at:{scope}'
+
+
+def touch(*scopes):
+    """
+    Обновляет метки областей scopes, без аргументов — метку сайта.
+    """
+    now = time.time()
+    cache.set_many({_key(scope): now for scope in scopes or (SITE,)}, None)
+
+
+def post_scopes(post_id, username, slug=None):
+    """
+    Области, где виден пост: общая лента, автор, группа и сам пост.
+    """
+    scopes = [INDEX, author(username), post(post_id)]
+    if slug:
+        scopes.append(group(slug))
+    return scopes
+
+
+def post_changed(post, previous_slug=None):
+    scopes = post_scopes(post.pk, post.author.username,
+                         post.group.slug if post.group else None)
+    if previous_slug:
+        scopes.append(group(previous_slug))
+    touch(*scopes)
+
+
+def posts_changed(post_ids):
+    """
+    Обновляет метки страниц, где видны посты (например, после
+    комментариев), одним запросом к базе.
+    """
+    rows = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'author__username', 'group__slug')
+    scopes = [scope for row in rows for scope in post_scopes(*row)]
+    if scopes:
+        touch(*scopes)
+
+
+def users_changed(user_ids):
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    scopes = [author(username) for username in usernames]
+    if scopes:
+        touch(*scopes)
+
+
+def changed_at(*scopes):
+    keys = [_key(scope) for scope in (SITE,) + scopes]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # Метка пропала из кэша: считаем, что всё изменилось сейчас.
+            cache.add(key, time.time(), None)
+            stamps[key] = cache.get(key)
+    return max(stamps.values())
+
+
+def conditional(scopes):
+    """
+    Декоратор condition для view, страница которого зависит от областей
+    scopes(**kwargs view).
+    """
+    def etag(request, *args, **kwargs):
+        parts = [
+            repr(changed_at(*scopes(**kwargs))),
+            str(request.user.pk),
+            request.get_full_path(),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # Страница пользователя зависит не только от времени изменения,
+        # а If-Modified-Since об этом не знает.
+        if request.user.is_authenticated:
+            return None
+        return datetime.fromtimestamp(changed_at(*scopes(**kwargs)),
+                                      timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
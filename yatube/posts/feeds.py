@@ -0,0 +1,158 @@
+"""
+Ленты Atom и RSS.
+
+Ленты последних постов (общая, группы, автора) строятся один раз
+и хранятся в кэше готовыми байтами вместе с ETag и временем сборки.
+Ссылки в ленте абсолютные, поэтому под ключом ленты лежат сборки
+по каждому адресу сайта (схема и хост запроса).
+Сигналы удаляют ленты, которые затронул изменённый пост, так что
+опрос агрегатором стоит одного чтения из кэша.
+
+Выгрузка всей истории автора пишется потоком: после каждой записи
+готовый кусок XML уходит клиенту, а посты читаются из базы пачками
+через iterator(), так что выгрузка любой длины не держит в памяти
+больше одной пачки.
+"""
+import hashlib
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+FORMATS = {'atom': Atom1Feed, 'rss': Rss201rev2Feed}
+
+
+class StreamingAtomFeed(Atom1Feed):
+    """
+    Atom1Feed, который отдаёт XML по частям. Записи берутся
+    из переданного итератора, а не из self.items.
+    """
+
+    def __init__(self, *args, updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.updated = updated
+
+    def latest_post_date(self):
+        # Родительский метод перебирает все записи, а их ещё нет.
+        return self.updated or super().latest_post_date()
+
+    def entry(self, **kwargs):
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def stream(self, entries, encoding='utf-8'):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, encoding)
+
+        def chunk():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        handler.startDocument()
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+        yield chunk()
+        for item in entries:
+            handler.startElement('entry', self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement('entry')
+            yield chunk()
+        handler.endElement('feed')
+        yield chunk()
+
+
+def _entry(request, post, username):
+    url = request.build_absolute_uri(
+        reverse('post', args=[username, post.id]))
+    return {
+        'title': Truncator(post.text).words(8),
+        'link': url,
+        'description': post.text,
+        'pubdate': post.pub_date,
+        'unique_id': url,
+        'author_name': username,
+        'categories': [post.group.title] if post.group else None,
+    }
+
+
+def feed_key(kind, name, fmt):
+    return f'feed:{kind}:{name}:{fmt}'
+
+
+def invalidate(kind, *names):
+    cache.delete_many([feed_key(kind, name, fmt)
+                       for name in names if name is not None
+                       for fmt in FORMATS])
+
+
+def post_changed(post, previous_slug=None):
+    """
+    Удаляет ленты, в которых был или появится пост.
+    """
+    invalidate('index', 'all')
+    invalidate('author', post.author.username)
+    invalidate('group', post.group.slug if post.group else None,
+               previous_slug)
+
+
+def cached_feed(request, kind, name, fmt, build):
+    """
+    Лента из кэша или собранная заново. build() возвращает заголовок,
+    адрес страницы и посты с author и group; может бросить Http404.
+    Результат — словарь с body, etag и last_modified (время сборки).
+    """
+    key = feed_key(kind, name, fmt)
+    base = request.build_absolute_uri('/')
+    builds = cache.get(key) or {}
+    if base in builds:
+        return builds[base]
+    title, link, posts = build()
+    feed = FORMATS[fmt](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=title,
+        feed_url=request.build_absolute_uri(),
+    )
+    for post in posts[:settings.FEED_ITEMS]:
+        feed.add_item(**_entry(request, post, post.author.username))
+    body = feed.writeString('utf-8').encode()
+    entry = {
+        'body': body,
+        'etag': '"{}"'.format(hashlib.md5(body).hexdigest()),
+        'last_modified': int(time.time()),
+    }
+    builds[base] = entry
+    cache.set(key, builds, settings.FEED_TIMEOUT)
+    return entry
+
+
+def profile_feed(request, author):
+    """
+    Лента StreamingAtomFeed и итератор её записей по всем постам автора.
+    """
+    posts = author.posts.order_by('-pub_date', '-id')
+    newest = posts.only('pub_date').first()
+    posts = posts.select_related('group')
+    link = request.build_absolute_uri(
+        reverse('profile', args=[author.username]))
+    feed = StreamingAtomFeed(
+        title=f'Записи {author.get_full_name() or author.username}',
+        link=link,
+        description='',
+        feed_url=request.build_absolute_uri(),
+        author_name=author.username,
+        updated=newest.pub_date if newest else None,
+    )
+
+    def entries():
+        for post in posts.iterator(chunk_size=settings.STREAM_CHUNK_SIZE):
+            yield feed.entry(**_entry(request, post, author.username))
+
+    return feed, entries()
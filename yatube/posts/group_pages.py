@@ -0,0 +1,42 @@
+"""
+Лента группы.
+
+Страницы листаются курсором по индексу (group, -pub_date, -id), так что
+глубокая история отдаётся так же быстро, как начало. Id постов первой
+страницы хранятся в кэше: посты выбираются по первичному ключу без
+сортировки. Порядок постов меняется, только когда пост приходит
+в группу или уходит из неё, и тогда сигналы удаляют запись кэша.
+Id читаются из основной базы, чтобы отставшая реплика не попала
+в кэш надолго.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core.paginator import CursorPaginator
+
+from .models import Post
+
+
+def _key(group_id):
+    return f'group_first_page:{group_id}'
+
+
+def invalidate(*group_ids):
+    cache.delete_many([_key(group_id) for group_id in group_ids
+                       if group_id is not None])
+
+
+def page(group, cursor=None):
+    posts = Post.objects.filter(group=group).select_related('author',
+                                                            'group')
+    paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE)
+    if cursor:
+        return paginator.get_page(cursor)
+    key = _key(group.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(posts.using('default').order_by(*paginator.ordering)
+                   .values_list('id', flat=True)[:paginator.per_page + 1])
+        cache.set(key, ids, settings.GROUP_PAGE_TIMEOUT)
+    rows = posts.in_bulk(ids) if ids else {}
+    return paginator.page_from_rows([rows[pk] for pk in ids if pk in rows])
@@ -0,0 +1,203 @@
+"""
+Лента обсуждаемых постов.
+
+Комментарий весит exp(-λ·возраст), λ = ln 2 / HOT_HALF_LIFE, рейтинг
+поста — сумма весов его комментариев. Все веса стареют одинаково,
+поэтому хранится log Σ exp(λ·(t_i − EPOCH)): порядок постов тот же,
+а значения не нужно пересчитывать со временем. Новый комментарий
+прибавляется через logaddexp.
+
+Вклады копятся в буфере процесса {post_id: логарифм вклада}
+и сбрасываются в HotPost одной пачкой: фоновым потоком раз
+в HOT_FLUSH_SECONDS или сразу при HOT_BUFFER_SIZE постах в буфере.
+Вклады попадают в буфер только после коммита: откаченная пачка
+(её переиграют) не оставит в буфере своих вкладов. Рейтинг
+обновляется по возможности: неудавшийся сброс пишется в лог,
+возвращает вклады в буфер и оставляет их фоновому потоку, а
+сохранение комментария не ломает. Страница /hot/ берёт
+id из кэша или первые строки индекса по score и не считает агрегаты
+по комментариям.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Comment, HotPost, Post
+
+logger = logging.getLogger(__name__)
+
+EPOCH = 1577836800  # 2020-01-01 UTC
+PAGE_KEY = 'hot_page'
+
+_buffer = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_started = False
+# Сброс по размеру не удался: до удачного сброса пишет только поток.
+_deferred = False
+
+
+def _rate():
+    return math.log(2) / settings.HOT_HALF_LIFE
+
+
+def weight(moment):
+    """
+    Логарифм веса комментария, оставленного в момент moment.
+    """
+    return _rate() * (moment.timestamp() - EPOCH)
+
+
+def logaddexp(a, b):
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def _threshold():
+    # Вклад меньше e^-HOT_CUTOFF от свежего комментария не влияет
+    # на ленту.
+    return weight(datetime.now(timezone.utc)) - settings.HOT_CUTOFF
+
+
+def _add(contributions):
+    for post_id, value in contributions:
+        current = _buffer.get(post_id)
+        _buffer[post_id] = (
+            value if current is None else logaddexp(current, value))
+
+
+def comments_added(comments):
+    contributions = [(comment.post_id, weight(comment.created))
+                     for comment in comments if comment.post_id is not None]
+    if contributions:
+        transaction.on_commit(lambda: _buffered(contributions))
+
+
+def _buffered(contributions):
+    with _lock:
+        _start()
+        _add(contributions)
+        due = not _deferred and (
+            len(_buffer) >= settings.HOT_BUFFER_SIZE
+            or time.monotonic() - _last_flush >= settings.HOT_FLUSH_SECONDS)
+    if not due:
+        return
+    try:
+        flush()
+    except Exception:
+        logger.exception('Не удалось записать рейтинг обсуждаемого, '
+                         'повторит фоновый поток')
+
+
+def comment_added(comment):
+    comments_added([comment])
+
+
+def flush():
+    """
+    Переносит буфер процесса в HotPost, возвращает число постов.
+    """
+    global _buffer, _last_flush, _deferred
+    with _lock:
+        pending, _buffer = _buffer, {}
+        _last_flush = time.monotonic()
+        _deferred = False
+    if not pending:
+        return 0
+    try:
+        written = _write(pending)
+    except Exception:
+        with _lock:
+            _add(pending.items())
+            _deferred = True
+        raise
+    cache.delete(PAGE_KEY)
+    return written
+
+
+def _write(pending):
+    with transaction.atomic():
+        # Сначала запись: на SQLite она берёт блокировку базы, на
+        # остальных — блокировку строк, поэтому другой процесс не
+        # прочитает те же очки до нашего коммита и не потеряет вклад.
+        HotPost.objects.filter(score__lt=_threshold()).delete()
+        HotPost.objects.filter(post_id__in=pending).update(score=F('score'))
+        existing = set(Post.objects.filter(pk__in=pending).values_list(
+            'pk', flat=True))
+        scores = dict(HotPost.objects.filter(
+            post_id__in=existing).values_list('post_id', 'score'))
+        updated, created = [], []
+        for post_id in existing:
+            value = pending[post_id]
+            if post_id in scores:
+                updated.append(HotPost(
+                    post_id=post_id,
+                    score=logaddexp(scores[post_id], value)))
+            else:
+                created.append(HotPost(post_id=post_id, score=value))
+        HotPost.objects.bulk_update(updated, ['score'], batch_size=500)
+        # Строку мог одновременно создать другой процесс: тогда
+        # транзакция откатится, а вклады вернутся в буфер.
+        HotPost.objects.bulk_create(created, batch_size=500)
+    return len(existing)
+
+
+def rebuild():
+    """
+    Пересчитывает рейтинг по свежим комментариям. Для обслуживания
+    и загрузок в обход сигналов, не для запросов.
+    """
+    horizon = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.HOT_CUTOFF / _rate())
+    scores = {}
+    rows = Comment.objects.filter(
+        created__gte=horizon, post__isnull=False
+    ).values_list('post_id', 'created').iterator()
+    for post_id, created in rows:
+        value = weight(created)
+        current = scores.get(post_id)
+        scores[post_id] = (
+            value if current is None else logaddexp(current, value))
+    with transaction.atomic():
+        HotPost.objects.all().delete()
+        HotPost.objects.bulk_create(
+            [HotPost(post_id=post_id, score=score)
+             for post_id, score in scores.items()],
+            batch_size=500)
+    cache.delete(PAGE_KEY)
+    return len(scores)
+
+
+def top_ids():
+    ids = cache.get(PAGE_KEY)
+    if ids is None:
+        ids = list(HotPost.objects.order_by('-score').values_list(
+            'post_id', flat=True)[:settings.HOT_POSTS])
+        cache.set(PAGE_KEY, ids, settings.HOT_PAGE_TIMEOUT)
+    return ids
+
+
+def _start():
+    global _started
+    if not _started:
+        _started = True
+        threading.Thread(target=_run, name='hot-flush', daemon=True).start()
+
+
+def _run():
+    while True:
+        time.sleep(settings.HOT_FLUSH_SECONDS)
+        if not _buffer:
+            continue
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать рейтинг обсуждаемого')
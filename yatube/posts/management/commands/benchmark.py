@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (override_settings, setup_databases,
+                               teardown_databases)
+
+from posts import benchmark
+
+
+@contextmanager
+def isolated_cache():
+    """
+    Подменяет кэш по умолчанию файлом во временном каталоге на время
+    прогона, чтобы его данные не попали к живым воркерам.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    config = dict(settings.CACHES['default'],
+                  LOCATION=os.path.join(directory, 'cache.sqlite3'))
+    previous = caches._caches
+    # Django 2.2 не сбрасывает созданные кэши при смене CACHES.
+    caches._caches = threading.local()
+    try:
+        with override_settings(CACHES=dict(settings.CACHES,
+                                           default=config)):
+            yield
+    finally:
+        caches._caches = previous
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет отдельную тестовую базу и замеряет задержки, '
+            'запросы и память представлений posts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--skew', type=float, default=1.2)
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--views', nargs='+', choices=benchmark.VIEWS,
+                            default=list(benchmark.VIEWS))
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--sqlite-seconds', type=float, default=2.0,
+                            help='длительность замера SQLite на режим')
+        parser.add_argument('--output', help='файл для результатов в JSON')
+        parser.add_argument('--baseline', help='JSON базового прогона')
+        parser.add_argument('--tolerance', type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)
+
+        # Данные прогона не должны попасть в рабочую базу, общий кэш
+        # и метрики живых воркеров.
+        with isolated_cache(), override_settings(METRICS_DIR=None):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                dataset = benchmark.seed(
+                    users=options['users'],
+                    groups=options['groups'],
+                    posts=options['posts'],
+                    comments=options['comments'],
+                    follows_per_user=options['follows_per_user'],
+                    skew=options['skew'],
+                    random_seed=options['seed'],
+                )
+                results = benchmark.run(
+                    views=options['views'],
+                    requests=options['requests'],
+                    skew=options['skew'],
+                    random_seed=options['seed'],
+                )
+                render = benchmark.render_cost()
+                throughput = benchmark.sqlite_throughput(
+                    seconds=options['sqlite_seconds'],
+                    random_seed=options['seed'])
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        report = {'dataset': dataset, 'results': results,
+                  'render_us_per_card': render, 'sqlite': throughput}
+        for view, metrics in results.items():
+            self.stdout.write(
+                f"{view:<14} p50 {metrics['p50_ms']:>8} ms  "
+                f"p95 {metrics['p95_ms']:>8} ms  "
+                f"p99 {metrics['p99_ms']:>8} ms  "
+                f"queries {metrics['queries']:>6}  "
+                f"peak {metrics['peak_kb']:>8} KB")
+        for mode, cost in render.items():
+            self.stdout.write(f'render {mode:<17} {cost:>8} us/card')
+        for mode, metrics in throughput.items():
+            self.stdout.write(
+                f"sqlite {mode:<8} reads {metrics['reads_per_s']:>7}/s  "
+                f"writes {metrics['writes_per_s']:>6}/s  "
+                f"busy {metrics['busy']:>4}")
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2, ensure_ascii=False)
+
+        if baseline is not None:
+            regressions = benchmark.compare(
+                results, baseline['results'], options['tolerance'])
+            for item in regressions:
+                self.stdout.write(
+                    f"{item['view']}: {item['metric']} "
+                    f"{item['baseline']} -> {item['current']}")
+            if regressions:
+                raise CommandError(
+                    f'Регрессий производительности: {len(regressions)}')
@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Строит недостающие миниатюры и сведения о картинках постов '
+            'в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Сколько картинок держать в очереди пула, '
+                                 'по умолчанию четыре на процесс')
+
+    def _start_pool(self):
+        # Дочерним процессам база не нужна, открытое соединение
+        # им лучше не наследовать.
+        connections.close_all()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        initializer=django.setup)
+
+    def _submit(self, post_id, image):
+        try:
+            return self.pool.submit(thumbnails.build, post_id, image)
+        except BrokenProcessPool:
+            # Упавший процесс ломает весь пул: остальные картинки
+            # строятся в новом.
+            self.pool.shutdown(wait=False)
+            self._start_pool()
+            return self.pool.submit(thumbnails.build, post_id, image)
+
+    def _collect(self, future, post_id, image):
+        try:
+            name, info = future.result()
+        except Exception as error:
+            # Битый файл, картинка-бомба или сломанный пул. Задачи
+            # сломанного пула тоже считаются ошибками: их подберёт
+            # следующий запуск.
+            self.failed += 1
+            self.stderr.write(
+                f'Пост {post_id}: {type(error).__name__}: {error}')
+            return
+        if thumbnails.store(post_id, image, name, info):
+            self.built += 1
+
+    def handle(self, *args, **options):
+        posts = iter(list(Post.objects.exclude(image='').exclude(
+            image=None).filter(
+                Q(thumbnail='') | Q(thumbnail=None) | Q(image_width=None)
+        ).values_list('pk', 'image')))
+        self.workers = options['workers']
+        window = options['batch_size'] or self.workers * 4
+        self.built = self.failed = 0
+        self._start_pool()
+        running = {}
+        try:
+            while True:
+                # В пуле не больше window задач: остальные картинки
+                # ждут своей очереди здесь, а не в памяти пула.
+                for post_id, image in islice(posts, window - len(running)):
+                    running[self._submit(post_id, image)] = (post_id, image)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future, *running.pop(future))
+        finally:
+            self.pool.shutdown()
+        self.stdout.write(
+            f'Построено миниатюр: {self.built}, ошибок: {self.failed}')
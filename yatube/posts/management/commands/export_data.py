@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        totals = transfer.export(options['directory'], options['format'],
+                                 options['chunk_size'])
+        for name, total in totals.items():
+            self.stdout.write(f'{name}: {total}')
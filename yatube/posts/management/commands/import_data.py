@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_data пакетными вставками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--defer-maintenance', action='store_true',
+            help='пересчитать счётчики, ленты и поиск один раз в конце')
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(options['batch_size'],
+                                     options['defer_maintenance'])
+        totals = importer.run(options['directory'], options['format'])
+        for name, total in totals.items():
+            self.stdout.write(f'{name}: {total}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import hot
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг обсуждаемых постов по свежим комментариям'
+
+    def handle(self, *args, **options):
+        total = hot.rebuild()
+        self.stdout.write(f'Постов в рейтинге: {total}')
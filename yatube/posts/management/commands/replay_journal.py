@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import writebehind
+
+
+class Command(BaseCommand):
+    help = ('Записывает в базу журналы отложенной записи, оставшиеся '
+            'от завершившихся процессов')
+
+    def handle(self, *args, **options):
+        total = writebehind.replay()
+        self.stdout.write(f'Записано строк: {total}')
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+        'body, kind UNINDEXED, post_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    from posts.stemmer import tokens
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    # Документ: rowid = 2 * id + offset, тип и id поста.
+    sources = (
+        ('post', Post.objects.all(), 'id', 0),
+        ('comment', Comment.objects.exclude(post=None), 'post_id', 1),
+    )
+    # Порции по возрастанию pk: в памяти не больше CHUNK_SIZE документов.
+    for kind, queryset, field, offset in sources:
+        last = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last).order_by('pk')
+                        .values_list('id', 'text', field)[:CHUNK_SIZE])
+            if not rows:
+                break
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO posts_search (rowid, body, kind, post_id) '
+                    'VALUES (%s, %s, %s, %s)',
+                    [(2 * pk + offset, ' '.join(tokens(text)), kind,
+                      post_id) for pk, text, post_id in rows],
+                )
+            last = rows[-1][0]
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_hot_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedJournal',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+            ],
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, F
 from django.contrib.auth import get_user_model
 
@@ -22,12 +22,30 @@ class Post(models.Model):
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               related_name='posts', blank=True, null=True)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    thumbnail = models.ImageField(upload_to='thumbs/', blank=True,
+                                  null=True, editable=False)
+    # Сведения о картинке записывает задача миниатюры, см. posts.thumbnails
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_format = models.CharField(max_length=10, blank=True,
+                                    editable=False)
+    image_bytes = models.PositiveIntegerField(null=True, editable=False)
+    image_preview = models.TextField(blank=True, editable=False)
+    comments_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -41,8 +59,20 @@ class Comment(models.Model):
     def __str__(self):
         return self.text[:10]
 
+    def delete(self, *args, **kwargs):
+        # Сигналов удаления у Comment нет: каскад от поста или автора
+        # удаляет комментарии одним запросом, см. posts.signals.
+        from .signals import comment_deleted
+        with transaction.atomic(using=kwargs.get('using')):
+            comment_deleted(self)
+            return super().delete(*args, **kwargs)
+
     class Meta:
         ordering = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -59,3 +89,72 @@ class Follow(models.Model):
                                    name='self_following')
 
         ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    authors_count = models.PositiveIntegerField(default=0)
+
+
+class GroupAuthor(models.Model):
+    """
+    Число постов автора в группе: по нему ведётся authors_count.
+    """
+    group = models.ForeignKey(Group, on_delete=models.CASCADE,
+                              related_name='+')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    posts_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'author'],
+                                    name='uniq_group_author'),
+        ]
+
+
+class HotPost(models.Model):
+    """
+    Рейтинг обсуждаемости поста: логарифм суммы весов комментариев,
+    см. posts.hot.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='hot')
+    score = models.FloatField(db_index=True)
+
+
+class AppliedJournal(models.Model):
+    """
+    Сегмент журнала отложенной записи, уже записанный в базу,
+    см. posts.writebehind.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='uniq_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_idx'),
+        ]
@@ -0,0 +1,166 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс — таблица SQLite FTS5 posts_search со стеммированным текстом:
+rowid 2 * id для поста и 2 * id + 1 для комментария. Индекс обновляется
+сигналами; полная перестройка — команда rebuild_search_index.
+На других СУБД поиск сводится к icontains по тексту постов.
+"""
+import math
+
+from django.db import connection, transaction
+
+from core.paginator import dump_cursor, in_range, load_cursor
+
+from .models import Comment, Post
+from .stemmer import tokens
+
+TABLE = 'posts_search'
+POST, COMMENT = 'post', 'comment'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    return 2 * pk + (1 if kind == COMMENT else 0)
+
+
+def _document(kind, obj):
+    post_id = obj.pk if kind == POST else obj.post_id
+    return (_rowid(kind, obj.pk), ' '.join(tokens(obj.text)), kind, post_id)
+
+
+def _insert(cursor, documents):
+    cursor.executemany(
+        f'INSERT OR REPLACE INTO {TABLE} (rowid, body, kind, post_id) '
+        'VALUES (%s, %s, %s, %s)',
+        documents,
+    )
+
+
+def index(kind, obj):
+    index_many(kind, [obj])
+
+
+def index_many(kind, objs):
+    if not available():
+        return
+    documents = [_document(kind, obj) for obj in objs
+                 if kind == POST or obj.post_id is not None]
+    if documents:
+        with connection.cursor() as cursor:
+            _insert(cursor, documents)
+
+
+def remove(kind, pk):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, pk)])
+
+
+def remove_comments(comments):
+    """
+    Удаляет из индекса комментарии queryset одним запросом.
+    """
+    if not available():
+        return
+    sql, params = comments.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN '
+                       f'(SELECT 2 * id + 1 FROM ({sql}))', params)
+
+
+def rebuild(chunk_size=2000):
+    """
+    Перестраивает индекс, читая таблицы порциями. Возвращает число
+    проиндексированных документов.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    total = 0
+    sources = (
+        (POST, Post.objects.only('id', 'text')),
+        (COMMENT, Comment.objects.exclude(post=None).only(
+            'id', 'text', 'post_id')),
+    )
+    for kind, queryset in sources:
+        chunk = []
+        for obj in queryset.order_by().iterator(chunk_size=chunk_size):
+            chunk.append(_document(kind, obj))
+            if len(chunk) >= chunk_size:
+                total += _flush(chunk)
+        total += _flush(chunk)
+    return total
+
+
+def _flush(chunk):
+    if not chunk:
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        _insert(cursor, chunk)
+    flushed = len(chunk)
+    chunk.clear()
+    return flushed
+
+
+def match_expression(query):
+    terms = [term for term in tokens(query) if term]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def encode_cursor(score, post_id):
+    return dump_cursor([score, post_id])
+
+
+def decode_cursor(cursor):
+    try:
+        score, post_id = load_cursor(cursor)
+    except (ValueError, TypeError):
+        return None
+    # Ранг — конечное число, id поста — целое в пределах INTEGER.
+    if (isinstance(score, bool) or not isinstance(score, (int, float))
+            or not math.isfinite(score)
+            or isinstance(post_id, bool) or not isinstance(post_id, int)
+            or not in_range(post_id)):
+        return None
+    return float(score), post_id
+
+
+def search(query, cursor=None, limit=10):
+    """
+    Возвращает посты по убыванию релевантности (bm25) и курсор
+    следующей страницы.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return [], None
+    if not available():
+        posts = list(Post.objects.filter(text__icontains=query)
+                     .select_related('author', 'group')[:limit])
+        return posts, None
+
+    sql = (f'SELECT post_id, MIN(rank) AS score FROM {TABLE} '
+           f'WHERE {TABLE} MATCH %s GROUP BY post_id ')
+    params = [expression]
+    position = decode_cursor(cursor)
+    if position is not None:
+        sql += 'HAVING (MIN(rank), post_id) > (%s, %s) '
+        params.extend(position)
+    sql += 'ORDER BY score, post_id LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    found = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _ in rows])
+    return [found[post_id] for post_id, _ in rows
+            if post_id in found], next_cursor
@@ -0,0 +1,154 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from . import cards, counters, etags, feeds, group_pages, hot, search
+from . import thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Пост могли перенести в другую группу: её лента и счётчики тоже
+    # меняются.
+    previous = None
+    if instance.pk is not None:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'group__slug').first()
+    instance._previous_group = previous or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    cards.bump('post', instance.pk)
+    previous_id, previous_slug = instance._previous_group
+    etags.post_changed(instance, previous_slug)
+    feeds.post_changed(instance, previous_slug)
+    search.index(search.POST, instance)
+    if created:
+        counters.post_added(instance)
+        timeline.fan_out(instance)
+    if created or previous_id != instance.group_id:
+        counters.group_post_added(previous_id, instance.author_id, -1)
+        counters.group_post_added(instance.group_id, instance.author_id)
+        group_pages.invalidate(previous_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cards.bump('post', instance.pk)
+    etags.post_changed(instance)
+    feeds.post_changed(instance)
+    search.remove(search.POST, instance.pk)
+    counters.post_added(instance, -1)
+    counters.group_post_added(instance.group_id, instance.author_id, -1)
+    group_pages.invalidate(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+        hot.comment_added(instance)
+    cards.bump('post', instance.post_id)
+    etags.posts_changed([instance.post_id])
+    search.index(search.COMMENT, instance)
+
+
+def comment_deleted(instance):
+    # Не сигнал: его зовёт Comment.delete(). С приёмником post_delete
+    # каскад загружал бы каждый комментарий и обслуживал его отдельно.
+    counters.comment_added(instance, -1)
+    cards.bump('post', instance.post_id)
+    etags.posts_changed([instance.post_id])
+    search.remove(search.COMMENT, instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Комментарии поста каскад удалит одним DELETE, из индекса они
+    # уходят так же одним запросом; счётчик удаляемого поста не нужен.
+    search.remove_comments(instance.comments.all())
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Комментарии под собственными постами уберёт post_deleting,
+    # под чужими — здесь, пачкой: их посты остаются.
+    comments = Comment.objects.filter(author=instance).exclude(
+        post__author=instance)
+    cards.bump_many('post', counters.comments_removed(comments))
+    search.remove_comments(comments)
+    etags.touch()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.group_created(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cards.bump('group', instance.pk)
+    etags.touch()
+    feeds.invalidate('group', instance.slug)
+    feeds.invalidate('index', 'all')
+    # При удалении группы посты остаются без группы (SET_NULL) без
+    # сигналов, а счётчики группы удаляются каскадом.
+    group_pages.invalidate(instance.pk)
+
+
+def _login_only(update_fields):
+    # Вход пользователя обновляет только last_login — карточки не меняются.
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance, update_fields=None, **kwargs):
+    # Автора могли переименовать: лента под старым именем тоже устарела.
+    previous = None
+    if instance.pk is not None and not _login_only(update_fields):
+        previous = User.objects.filter(pk=instance.pk).values_list(
+            'username', flat=True).first()
+    instance._previous_username = previous
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, update_fields=None, **kwargs):
+    if not _login_only(update_fields):
+        cards.bump('author', instance.pk)
+        etags.touch()
+        previous = getattr(instance, '_previous_username', None)
+        feeds.invalidate('author', instance.username, previous)
+        feeds.invalidate('index', 'all')
+        if previous is not None and previous != instance.username:
+            # Имя автора есть и в ссылках лент групп с его постами.
+            feeds.invalidate('group', *Group.objects.filter(
+                posts__author=instance).values_list('slug', flat=True)
+                .distinct())
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.follow_added(instance)
+        timeline.follow_added(instance)
+        etags.users_changed([instance.user_id, instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_added(instance, -1)
+    timeline.follow_removed(instance)
+    etags.users_changed([instance.user_id, instance.author_id])
+
+
+@receiver(setting_changed)
+def storage_changed(setting, **kwargs):
+    # Тесты подменяют MEDIA_ROOT на временный каталог и удаляют его:
+    # миниатюры, поставленные до смены, должны успеть записаться.
+    if setting in ('MEDIA_ROOT', 'DEFAULT_FILE_STORAGE'):
+        thumbnails.drain()
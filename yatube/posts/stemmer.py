@@ -0,0 +1,126 @@
+"""
+Стеммер для поискового индекса: Snowball для русского языка
+и упрощённое отсечение окончаний для английского.
+"""
+import re
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+_VOWELS = 'аеиоуыэюя'
+
+_PERFECTIVE_1 = ('вшись', 'вши', 'в')
+_PERFECTIVE_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+_REFLEXIVE = ('ся', 'сь')
+_ADJECTIVE = ('ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые',
+              'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их',
+              'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+_PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+_PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+_VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+           'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+_VERB_2 = ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило',
+           'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей',
+           'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю')
+_NOUN = ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+         'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах',
+         'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+         'ь', 'ю', 'я')
+_SUPERLATIVE = ('ейше', 'ейш')
+_DERIVATIONAL = ('ость', 'ост')
+
+_ENGLISH = ('ational', 'ization', 'fulness', 'ousness', 'iveness', 'ations',
+            'ation', 'ments', 'ment', 'ness', 'ings', 'ing', 'edly', 'ies',
+            'ied', 'ers', 'er', 'ed', 'ly', 'es', 's')
+
+
+def _regions(word):
+    rv = r1 = r2 = len(word)
+    for i, letter in enumerate(word):
+        if letter in _VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings, after=None):
+    """
+    Отрезает первое подходящее окончание, целиком лежащее в word[start:].
+    Для окончаний с after перед окончанием должна стоять одна из букв.
+    """
+    for ending in endings:
+        if not word.endswith(ending):
+            continue
+        cut = len(word) - len(ending)
+        if cut < start:
+            continue
+        if after is not None:
+            if cut - 1 < start or word[cut - 1] not in after:
+                continue
+        return word[:cut]
+    return None
+
+
+def _russian(word):
+    word = word.replace('ё', 'е')
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1
+    stem = (_strip(word, rv, _PERFECTIVE_1, 'ая')
+            or _strip(word, rv, _PERFECTIVE_2))
+    if stem is not None:
+        word = stem
+    else:
+        word = _strip(word, rv, _REFLEXIVE) or word
+        stem = _strip(word, rv, _ADJECTIVE)
+        if stem is not None:
+            word = (_strip(stem, rv, _PARTICIPLE_1, 'ая')
+                    or _strip(stem, rv, _PARTICIPLE_2)
+                    or stem)
+        else:
+            word = (_strip(word, rv, _VERB_1, 'ая')
+                    or _strip(word, rv, _VERB_2)
+                    or _strip(word, rv, _NOUN)
+                    or word)
+
+    # Шаг 2
+    word = _strip(word, rv, ('и',)) or word
+    # Шаг 3
+    word = _strip(word, r2, _DERIVATIONAL) or word
+    # Шаг 4
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    stem = _strip(word, rv, _SUPERLATIVE)
+    if stem is not None:
+        return stem[:-1] if stem.endswith('нн') else stem
+    return _strip(word, rv, ('ь',)) or word
+
+
+def _english(word):
+    if word.endswith("'s"):
+        word = word[:-2]
+    for ending in _ENGLISH:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            stem = word[:-len(ending)]
+            return stem + 'y' if ending in ('ies', 'ied') else stem
+    return word
+
+
+def stem(word):
+    word = word.lower()
+    if any('а' <= letter <= 'я' or letter == 'ё' for letter in word):
+        return _russian(word)
+    return _english(word)
+
+
+def tokens(text):
+    return [stem(word) for word in WORD.findall(text or '')]
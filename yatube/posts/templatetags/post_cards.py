@@ -0,0 +1,44 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_card, render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    return mark_safe(render_card(post))
+
+
+@register.simple_tag(takes_context=True)
+def load_cards(context, posts):
+    """
+    Готовит карточки всех постов страницы за пару обращений к кэшу,
+    post_item в цикле берёт их отсюда. Ставится перед циклом.
+    """
+    context.render_context['post_cards'] = render_cards(posts)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def post_item(context, post):
+    """
+    Карточка поста в ленте: кэшированная часть и кнопка редактирования,
+    которая зависит от пользователя и потому не кэшируется.
+    """
+    footer = ''
+    user = context.get('user')
+    if user is not None and user.pk == post.author_id:
+        footer = format_html(
+            '<div class="card-footer">'
+            '<a class="btn btn-sm btn-info" href="{}" role="button">'
+            'Редактировать</a></div>',
+            reverse('post_edit', args=[post.author.username, post.id]))
+    card = context.render_context.get('post_cards', {}).get(post.pk)
+    if card is None:
+        card = render_card(post)
+    return format_html('<div class="card mb-3 mt-1 shadow-sm">{}{}</div>',
+                       mark_safe(card), footer)
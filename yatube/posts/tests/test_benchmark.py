@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import benchmark
+from posts.management.commands.benchmark import isolated_cache
+from posts.models import Post, TimelineEntry, UserStats
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_and_run(self):
+        dataset = benchmark.seed(users=10, groups=2, posts=50, comments=60,
+                                 follows_per_user=3)
+        self.assertEqual(Post.objects.count(), dataset['posts'])
+        self.assertEqual(UserStats.objects.count(), dataset['users'])
+        self.assertTrue(TimelineEntry.objects.exists())
+
+        results = benchmark.run(requests=3, warmup=1, memory_samples=1,
+                                clients=2)
+        self.assertEqual(set(results), set(benchmark.VIEWS))
+        for view, metrics in results.items():
+            with self.subTest(view=view):
+                self.assertEqual(metrics['errors'], 0)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreater(metrics['peak_kb'], 0)
+
+    def test_compare(self):
+        baseline = {'index': {'p95_ms': 10.0, 'queries': 3}}
+        results = {'index': {'p95_ms': 11.0, 'queries': 5}}
+        regressions = benchmark.compare(results, baseline, tolerance=0.2)
+        self.assertEqual(regressions, [{'view': 'index', 'metric': 'queries',
+                                        'baseline': 3, 'current': 5}])
+
+    def test_render_cost(self):
+        benchmark.seed(users=3, groups=1, posts=5, comments=0,
+                       follows_per_user=1)
+        costs = benchmark.render_cost(cards=5, rounds=2)
+        self.assertEqual(set(costs), {'uncached_include', 'cached_include',
+                                      'cached_tag'})
+        self.assertTrue(all(cost > 0 for cost in costs.values()))
+
+    def test_sqlite_throughput(self):
+        benchmark.seed(users=3, groups=1, posts=5, comments=0,
+                       follows_per_user=1)
+        results = benchmark.sqlite_throughput(seconds=0.2, readers=2,
+                                              writers=1)
+        self.assertEqual(set(results), {'default', 'tuned'})
+        for mode, metrics in results.items():
+            with self.subTest(mode=mode):
+                self.assertGreater(metrics['reads_per_s'], 0)
+                self.assertGreater(metrics['writes_per_s'], 0)
+
+    def test_isolated_cache(self):
+        cache.set('key', 'shared')
+        with isolated_cache():
+            self.assertIsNone(cache.get('key'))
+            cache.set('key', 'isolated')
+        self.assertEqual(cache.get('key'), 'shared')
@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase
+
+from core.cache import SQLiteCache
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        other = self.make_cache()
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_timeout(self):
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'value'))
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_incr(self):
+        other = self.make_cache()
+        self.cache.set('counter', 1)
+        self.assertEqual(other.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 10), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_version(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.incr_version('key'), 2)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', version=2), 'value')
+
+    def test_least_recently_used_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        cache.touch_interval = 0
+        for i in range(4):
+            cache.set(f'key{i}', i)
+        cache.get('key0')
+        cache.set('key4', 4)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertIsNone(cache.get('key2'))
+        self.assertEqual(cache.get('key4'), 4)
+
+    def test_falls_back_to_memory(self):
+        cache = SQLiteCache(self.directory, {})
+        with self.assertLogs('core.cache', 'WARNING'):
+            cache.set('key', 'value')
+        with self.assertLogs('core.cache', 'WARNING'):
+            self.assertEqual(cache.get('key'), 'value')
+
+    def test_locked_write_is_not_hidden(self):
+        self.cache.set('key', 'old')
+        cache = self.make_cache(BUSY_TIMEOUT=0)
+        holder = sqlite3.connect(self.location, isolation_level=None)
+        holder.execute('BEGIN IMMEDIATE')
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                cache.set('key', 'new')
+        finally:
+            holder.execute('ROLLBACK')
+            holder.close()
+        self.assertEqual(cache.get('key'), 'old')
+
+    def test_tests_use_private_cache(self):
+        location = settings.CACHES['default']['LOCATION']
+        self.assertFalse(location.startswith(settings.BASE_DIR))
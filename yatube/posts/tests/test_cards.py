@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Comment
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='admin1')
+        cls.reader = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.post = Post.objects.create(text='Старый текст',
+                                       author=PostCardCacheTests.author,
+                                       group=PostCardCacheTests.group)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(PostCardCacheTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(PostCardCacheTests.reader)
+        cache.clear()
+
+    def get_index(self, client=None):
+        client = client or self.reader_client
+        return client.get(reverse('index')).content.decode()
+
+    def test_card_is_reused_until_post_changes(self):
+        self.get_index()
+        Post.objects.update(text='Новый текст')
+        self.assertIn('Старый текст', self.get_index())
+
+        post = Post.objects.get(pk=PostCardCacheTests.post.pk)
+        post.save()
+        self.assertIn('Новый текст', self.get_index())
+
+    def test_comment_refreshes_card(self):
+        self.get_index()
+        Comment.objects.create(text='Комментарий',
+                               author=PostCardCacheTests.reader,
+                               post=PostCardCacheTests.post)
+        self.assertIn('Комментариев: 1', self.get_index())
+
+    def test_group_change_refreshes_card(self):
+        self.get_index()
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertIn('#Новая группа', self.get_index())
+
+    def test_edit_button_is_not_cached(self):
+        edit_url = reverse('post_edit', kwargs={
+            'username': 'admin1', 'post_id': PostCardCacheTests.post.id})
+        self.assertNotIn(edit_url, self.get_index())
+        self.assertIn(edit_url, self.get_index(self.author_client))
+        self.assertNotIn(edit_url, self.get_index())
+
+    def test_page_cards_read_in_batch(self):
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}',
+                                author=PostCardCacheTests.author)
+        self.get_index()
+        with mock.patch('posts.cards.cache', mock.Mock(wraps=cache)) as spy:
+            self.assertIn('Пост 2', self.get_index())
+        self.assertEqual(spy.get_many.call_count, 2)
+        self.assertFalse(spy.get.called)
+        self.assertFalse(spy.set_many.called)
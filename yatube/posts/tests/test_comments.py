@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User, Comment
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.post = Post.objects.create(text='Текст', author=cls.user)
+        for i in range(7):
+            Comment.objects.create(text=f'Комментарий {i}', author=cls.user,
+                                   post=cls.post)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_post_page_shows_first_comments(self):
+        response = self.client.get(reverse('post', kwargs={
+            'username': 'admin1', 'post_id': CommentPagesTests.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(self.texts(comments),
+                         ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+        self.assertContains(response, 'js-more-comments')
+
+    def test_fragment_pages(self):
+        url = reverse('post_comments', kwargs={
+            'username': 'admin1', 'post_id': CommentPagesTests.post.id})
+        texts = []
+        cursor = ''
+        while True:
+            with self.assertNumQueries(2):
+                response = self.client.get(url, {'cursor': cursor})
+            comments = response.context['comments']
+            texts.extend(self.texts(comments))
+            if not comments.has_next():
+                break
+            cursor = comments.paginator.next_cursor
+        self.assertEqual(texts, [f'Комментарий {i}' for i in range(7)])
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_json(self):
+        url = reverse('post_comments', kwargs={
+            'username': 'admin1', 'post_id': CommentPagesTests.post.id})
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual([item['text'] for item in data['comments']],
+                         ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+        self.assertEqual(data['comments'][0]['author'], 'admin1')
+        data = self.client.get(url, {'format': 'json',
+                                     'cursor': data['next_cursor']}).json()
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий 3')
@@ -0,0 +1,87 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts import counters, search
+from posts.models import Post, User, Follow, Comment, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=CountersTests.author)
+
+    def test_comments_count(self):
+        comment = Comment.objects.create(text='Комментарий',
+                                         author=CountersTests.user,
+                                         post=CountersTests.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_user_stats(self):
+        stats = counters.stats_for(CountersTests.author.id)
+        self.assertEqual(stats.posts_count, 1)
+
+        Follow.objects.create(user=CountersTests.user,
+                              author=CountersTests.author)
+        Post.objects.create(text='Тестовый текст',
+                            author=CountersTests.author)
+        stats.refresh_from_db()
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(
+            counters.stats_for(CountersTests.user.id).following_count, 1)
+
+        Follow.objects.all().delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_recount_repairs_drift(self):
+        stats = counters.stats_for(CountersTests.author.id)
+        Post.objects.update(comments_count=5)
+        UserStats.objects.update(posts_count=7)
+
+        call_command('recount_counters', stdout=open('/dev/null', 'w'))
+        self.post.refresh_from_db()
+        stats.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(stats.posts_count, 1)
+
+    def test_cascade_deletes_comments_in_bulk(self):
+        post = Post.objects.create(text='Пост', author=CountersTests.author)
+        Comment.objects.bulk_create(
+            [Comment(text='Удаляемый отзыв', author=CountersTests.user,
+                     post=post) for _ in range(20)])
+        search.index_many(search.COMMENT, Comment.objects.filter(post=post))
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        comment_queries = [query['sql'] for query in queries.captured_queries
+                           if 'posts_comment' in query['sql']]
+        self.assertLessEqual(len(comment_queries), 2)
+        self.assertFalse(Comment.objects.exists())
+        if search.available():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {search.TABLE} '
+                               'WHERE post_id = %s', [post.pk])
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_deleted_user_comments_leave_counters(self):
+        commenter = User.objects.create(username='commenter')
+        for _ in range(3):
+            Comment.objects.create(text='Отзыв', author=commenter,
+                                   post=CountersTests.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        commenter.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertFalse(Comment.objects.exists())
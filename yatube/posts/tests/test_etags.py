@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Comment, Follow
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.post = Post.objects.create(text='Текст', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+        cache.clear()
+
+    def urls(self):
+        post = ConditionalGetTests.post
+        return [
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': 'admin2'}),
+            reverse('post', kwargs={'username': 'admin2',
+                                    'post_id': post.id}),
+        ]
+
+    def test_not_modified(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                # Первый ответ ставит CSRF-cookie, она входит в ETag.
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        url = self.urls()[0]
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(text='Комментарий',
+                               author=ConditionalGetTests.user,
+                               post=ConditionalGetTests.post)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        url = self.urls()[0]
+        etag = self.client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_keep_unrelated_etags(self):
+        other = Group.objects.create(title='Другая', slug='other')
+        Post.objects.create(text='Другой пост',
+                            author=ConditionalGetTests.user, group=other)
+        post = ConditionalGetTests.post
+        unrelated = [reverse('group_posts', kwargs={'slug': 'other'}),
+                     reverse('profile', kwargs={'username': 'admin1'})]
+        related = self.urls()
+        # Страница поста с формой ставит CSRF-cookie, она входит в ETag.
+        self.client.get(related[-1])
+        etags = {url: self.client.get(url)['ETag']
+                 for url in unrelated + related}
+        Comment.objects.create(text='Комментарий',
+                               author=ConditionalGetTests.user, post=post)
+        for url in unrelated:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 304)
+        for url in related:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_etag(self):
+        url = reverse('profile', kwargs={'username': 'admin2'})
+        index = reverse('index')
+        self.client.get(self.urls()[-1])
+        etag, index_etag = (self.client.get(url)['ETag'],
+                            self.client.get(index)['ETag'])
+        Follow.objects.create(user=ConditionalGetTests.user,
+                              author=ConditionalGetTests.author)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(
+            index, HTTP_IF_NONE_MATCH=index_etag).status_code, 304)
@@ -0,0 +1,120 @@
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.group = Group.objects.create(title='Тест', slug='test',
+                                         description='Описание')
+        cls.other = Group.objects.create(title='Другая', slug='other',
+                                         description='Описание')
+        cls.post = Post.objects.create(text='Первый пост', author=cls.user,
+                                       group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def texts(self, url, fmt='atom'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        feed = ElementTree.fromstring(response.content)
+        if fmt == 'atom':
+            return [entry.find(f'{ATOM}summary').text
+                    for entry in feed.iter(f'{ATOM}entry')]
+        return [item.find('description').text for item in feed.iter('item')]
+
+    def test_feeds(self):
+        urls = [
+            reverse('index_feed', args=['atom']),
+            reverse('group_feed', args=['test', 'atom']),
+            reverse('author_feed', args=['admin1', 'atom']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.texts(url), ['Первый пост'])
+        self.assertEqual(self.texts(reverse('index_feed', args=['rss']),
+                                    'rss'), ['Первый пост'])
+        response = self.client.get(reverse('index_feed', args=['rss']))
+        self.assertEqual(response['Content-Type'],
+                         'application/rss+xml; charset=utf-8')
+
+    def test_unknown_feed(self):
+        for url in (reverse('index_feed', args=['json']),
+                    reverse('group_feed', args=['missing', 'atom']),
+                    reverse('author_feed', args=['missing', 'rss'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_renamed_author_feed_is_dropped(self):
+        author = User.objects.create(username='old_name')
+        Post.objects.create(text='Пост автора', author=author)
+        url = reverse('author_feed', args=['old_name', 'atom'])
+        self.assertEqual(self.texts(url), ['Пост автора'])
+
+        author.username = 'new_name'
+        author.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(
+            self.texts(reverse('author_feed', args=['new_name', 'atom'])),
+            ['Пост автора'])
+
+    def test_renamed_author_group_feed_is_dropped(self):
+        author = User.objects.create(username='old_name')
+        Post.objects.create(text='Пост автора', author=author,
+                            group=self.group)
+        url = reverse('group_feed', args=['test', 'atom'])
+        self.assertIn(b'/old_name/', self.client.get(url).content)
+
+        author.username = 'new_name'
+        author.save()
+        content = self.client.get(url).content
+        self.assertNotIn(b'/old_name/', content)
+        self.assertIn(b'/new_name/', content)
+
+    def test_links_follow_request_host(self):
+        url = reverse('index_feed', args=['atom'])
+        self.assertIn(b'http://localhost/',
+                      self.client.get(url, HTTP_HOST='localhost').content)
+        content = self.client.get(url, HTTP_HOST='127.0.0.1').content
+        self.assertIn(b'http://127.0.0.1/', content)
+        self.assertNotIn(b'http://localhost/', content)
+
+    def test_cached_and_conditional(self):
+        url = reverse('group_feed', args=['test', 'rss'])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=cached['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_and_moved_posts_refresh_feeds(self):
+        index = reverse('index_feed', args=['atom'])
+        group = reverse('group_feed', args=['test', 'atom'])
+        other = reverse('group_feed', args=['other', 'atom'])
+        for url in (index, group, other):
+            self.texts(url)
+        Post.objects.create(text='Второй пост', author=FeedTests.user)
+        self.assertEqual(self.texts(index), ['Второй пост', 'Первый пост'])
+
+        post = Post.objects.get(pk=FeedTests.post.pk)
+        post.group = FeedTests.other
+        post.save()
+        self.assertEqual(self.texts(group), [])
+        self.assertEqual(self.texts(other), ['Первый пост'])
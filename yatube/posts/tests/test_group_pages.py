@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import counters, group_pages
+from posts.models import Post, Group, GroupStats, User
+
+
+class GroupPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test',
+                                         description='Описание')
+        cls.other = Group.objects.create(title='Другая', slug='other',
+                                         description='Описание')
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=cls.user,
+                                group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def texts(self, page):
+        return [post.text for post in page]
+
+    def test_all_pages(self):
+        url = reverse('group_posts', args=['test'])
+        texts = []
+        cursor = ''
+        while True:
+            page = self.client.get(url, {'cursor': cursor}).context['page']
+            texts.extend(self.texts(page))
+            if not page.has_next():
+                break
+            cursor = page.paginator.next_cursor
+        self.assertEqual(texts, [f'Пост {i}' for i in range(24, -1, -1)])
+
+    def test_first_page_ids_are_cached(self):
+        group = GroupPagesTests.group
+        with self.assertNumQueries(2):
+            first = group_pages.page(group)
+        with self.assertNumQueries(1):
+            cached = group_pages.page(group)
+        self.assertEqual(self.texts(cached), self.texts(first))
+        self.assertEqual(cached.paginator.next_cursor,
+                         first.paginator.next_cursor)
+
+    def test_joining_and_leaving_refresh_first_page(self):
+        group = GroupPagesTests.group
+        group_pages.page(group)
+        post = Post.objects.create(text='Новый', author=GroupPagesTests.author,
+                                   group=group)
+        self.assertEqual(self.texts(group_pages.page(group))[0], 'Новый')
+        post.group = GroupPagesTests.other
+        post.save()
+        self.assertNotIn('Новый', self.texts(group_pages.page(group)))
+        self.assertEqual(
+            self.texts(group_pages.page(GroupPagesTests.other)), ['Новый'])
+        post.delete()
+        self.assertEqual(
+            self.texts(group_pages.page(GroupPagesTests.other)), [])
+
+    def test_deleted_group_leaves_posts_without_group(self):
+        group = Group.objects.create(title='Временная', slug='temp')
+        post = Post.objects.create(text='Пост', author=GroupPagesTests.user,
+                                   group=group)
+        counters.group_stats_for(group.pk)
+        group_pages.page(group)
+        group.delete()
+        post.refresh_from_db()
+        self.assertIsNone(post.group)
+        self.assertFalse(GroupStats.objects.filter(group_id=group.pk)
+                         .exists())
+        self.assertEqual(self.client.get(
+            reverse('group_posts', args=['temp'])).status_code, 404)
+
+    def test_stats(self):
+        group = GroupPagesTests.group
+        response = self.client.get(reverse('group_posts', args=['test']))
+        self.assertEqual(response.context['stats'].posts_count, 25)
+        self.assertEqual(response.context['stats'].authors_count, 1)
+
+        post = Post.objects.create(text='Пост', author=GroupPagesTests.author,
+                                   group=group)
+        stats = counters.group_stats_for(group.pk)
+        self.assertEqual((stats.posts_count, stats.authors_count), (26, 2))
+        post.group = GroupPagesTests.other
+        post.save()
+        stats = counters.group_stats_for(group.pk)
+        self.assertEqual((stats.posts_count, stats.authors_count), (25, 1))
+        other = counters.group_stats_for(GroupPagesTests.other.pk)
+        self.assertEqual((other.posts_count, other.authors_count), (1, 1))
+        post.delete()
+        other = counters.group_stats_for(GroupPagesTests.other.pk)
+        self.assertEqual((other.posts_count, other.authors_count), (0, 0))
+        self.assertEqual(counters.recount(), 0)
+
+        GroupStats.objects.filter(group=group).update(authors_count=7)
+        self.assertEqual(counters.recount(), 1)
+        stats = counters.group_stats_for(group.pk)
+        self.assertEqual((stats.posts_count, stats.authors_count), (25, 1))
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import hot
+from posts.models import Comment, HotPost, Post, User
+
+
+@override_settings(HOT_BUFFER_SIZE=1, HOT_FLUSH_SECONDS=3600)
+class HotTests(TransactionTestCase):
+    # Вклады попадают в буфер после коммита, поэтому тестам нужны
+    # настоящие транзакции.
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        hot._buffer.clear()
+        self.user = User.objects.create(username='admin1')
+        self.posts = [Post.objects.create(text=f'Пост {i}', author=self.user)
+                      for i in range(4)]
+
+    def comment(self, post, hours_ago=0):
+        return Comment(post_id=post.pk, author=self.user, text='Текст',
+                       created=timezone.now() - timedelta(hours=hours_ago))
+
+    def ranked(self):
+        return list(HotPost.objects.order_by('-score').values_list(
+            'post_id', flat=True))
+
+    def test_recent_comments_outrank_old(self):
+        first, second, third, _ = self.posts
+        hot.comments_added([self.comment(first, 30) for _ in range(8)])
+        hot.comments_added([self.comment(second) for _ in range(2)])
+        hot.comments_added([self.comment(third, 1)])
+        self.assertEqual(self.ranked(), [second.pk, third.pk, first.pk])
+
+    def test_equal_decay(self):
+        first, second = self.posts[:2]
+        hot.comments_added([self.comment(first, 6), self.comment(first, 6)])
+        hot.comments_added([self.comment(second)])
+        scores = dict(HotPost.objects.values_list('post_id', 'score'))
+        self.assertAlmostEqual(scores[first.pk], scores[second.pk], places=4)
+
+    def test_stale_posts_pruned(self):
+        first, second = self.posts[:2]
+        hot.comments_added([self.comment(first, 24 * 7)])
+        hot.comments_added([self.comment(second)])
+        self.assertEqual(self.ranked(), [second.pk])
+
+    @override_settings(HOT_BUFFER_SIZE=100)
+    def test_comments_buffered(self):
+        Comment.objects.create(post=self.posts[0], author=self.user,
+                               text='Текст')
+        self.assertFalse(HotPost.objects.exists())
+        self.assertEqual(hot.flush(), 1)
+        self.assertEqual(self.ranked(), [self.posts[0].pk])
+
+    def test_failed_flush_does_not_break_comment(self):
+        self.client.force_login(self.user)
+        post = self.posts[0]
+        with mock.patch.object(
+                hot, '_write',
+                side_effect=OperationalError('database is locked')):
+            with self.assertLogs('posts.hot', 'ERROR'):
+                response = self.client.post(
+                    reverse('add_comment', args=['admin1', post.pk]),
+                    data={'text': 'Текст'})
+            self.assertEqual(response.status_code, 302)
+            # Пока сброс не удался, по размеру буфера он не повторяется.
+            hot.comments_added([self.comment(post)])
+        self.assertEqual(Comment.objects.filter(post=post).count(), 1)
+        self.assertEqual(hot.flush(), 1)
+        self.assertEqual(self.ranked(), [post.pk])
+
+    def test_rolled_back_comments_not_buffered(self):
+        with self.assertRaises(ZeroDivisionError):
+            with transaction.atomic():
+                hot.comments_added([self.comment(self.posts[0])])
+                1 / 0
+        self.assertFalse(hot._buffer)
+        self.assertEqual(hot.flush(), 0)
+
+    @override_settings(HOT_BUFFER_SIZE=100)
+    def test_failed_flush_keeps_buffer(self):
+        hot.comments_added([self.comment(self.posts[0])])
+        with mock.patch.object(HotPost.objects, 'bulk_create',
+                               side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                hot.flush()
+        self.assertFalse(HotPost.objects.exists())
+        self.assertEqual(hot.flush(), 1)
+        self.assertEqual(self.ranked(), [self.posts[0].pk])
+
+    def test_rebuild_matches_incremental(self):
+        for i, post in enumerate(self.posts):
+            for _ in range(i + 1):
+                Comment.objects.create(post=post, author=self.user,
+                                       text='Текст')
+        incremental = dict(HotPost.objects.values_list('post_id', 'score'))
+        hot.rebuild()
+        rebuilt = dict(HotPost.objects.values_list('post_id', 'score'))
+        self.assertEqual(set(rebuilt), set(incremental))
+        for post_id, score in rebuilt.items():
+            self.assertAlmostEqual(score, incremental[post_id], places=4)
+
+    def test_page_without_comment_aggregates(self):
+        first, second = self.posts[:2]
+        hot.comments_added([self.comment(first)])
+        hot.comments_added([self.comment(second) for _ in range(3)])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('hot'))
+        self.assertEqual([post.pk for post in response.context['posts']],
+                         [second.pk, first.pk])
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_comment' in query['sql']])
+        hot.comments_added([self.comment(first) for _ in range(5)])
+        response = self.client.get(reverse('hot'))
+        self.assertEqual([post.pk for post in response.context['posts']],
+                         [first.pk, second.pk])
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+
+def sample(text, name, **labels):
+    pattern = re.escape(name) + r'\{([^}]*)\} (\S+)'
+    for found, value in re.findall(pattern, text):
+        pairs = dict(re.findall(r'(\w+)="([^"]*)"', found))
+        if pairs == labels:
+            return float(value)
+    return 0
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        for _ in range(3):
+            Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(METRICS_DIR=self.directory,
+                                          METRICS_TOKEN='secret')
+        self.settings.enable()
+        self.client = Client()
+        cache.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_cache_and_templates(self):
+        before = self.scrape()
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        after = self.scrape()
+        self.assertEqual(
+            sample(after, 'yatube_request_duration_seconds_count',
+                   view='index')
+            - sample(before, 'yatube_request_duration_seconds_count',
+                     view='index'), 2)
+        self.assertEqual(
+            sample(after, 'yatube_request_queries_bucket',
+                   view='index', le='+Inf')
+            - sample(before, 'yatube_request_queries_bucket',
+                     view='index', le='+Inf'), 2)
+        for result in ('hit', 'miss'):
+            self.assertEqual(
+                sample(after, 'yatube_cache_requests_total',
+                       layer='card', result=result)
+                - sample(before, 'yatube_cache_requests_total',
+                         layer='card', result=result), 3)
+        self.assertGreater(
+            sample(after, 'yatube_template_render_seconds_count',
+                   template='posts/index.html'),
+            sample(before, 'yatube_template_render_seconds_count',
+                   template='posts/index.html'))
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      after)
+
+    def test_workers_are_summed(self):
+        before = self.scrape()
+        other = {'yatube_cache_requests_total': [[['card', 'hit'], 5]]}
+        with open(os.path.join(self.directory, '1.json'), 'w') as target:
+            json.dump(other, target)
+        after = self.scrape()
+        self.assertEqual(
+            sample(after, 'yatube_cache_requests_total',
+                   layer='card', result='hit')
+            - sample(before, 'yatube_cache_requests_total',
+                     layer='card', result='hit'), 5)
+
+    def test_dead_workers_are_compacted(self):
+        before = self.scrape()
+        other = {'yatube_cache_requests_total': [[['card', 'hit'], 5]]}
+        for name in ('1', '2-dead'):
+            with open(os.path.join(self.directory, f'{name}.json'),
+                      'w') as target:
+                json.dump(other, target)
+        # У файла 2-dead есть блокировка, но её никто не держит.
+        open(os.path.join(self.directory, '2-dead.lock'), 'w').close()
+        first, second = self.scrape(), self.scrape()
+        for after in (first, second):
+            self.assertEqual(
+                sample(after, 'yatube_cache_requests_total',
+                       layer='card', result='hit')
+                - sample(before, 'yatube_cache_requests_total',
+                         layer='card', result='hit'), 10)
+        names = os.listdir(self.directory)
+        self.assertIn('aggregate.json', names)
+        for name in ('1.json', '2-dead.json', '2-dead.lock'):
+            self.assertNotIn(name, names)
+
+    def test_live_worker_is_not_compacted(self):
+        self.scrape()
+        own = os.path.basename(metrics._worker.path)
+        self.scrape()
+        names = os.listdir(self.directory)
+        self.assertIn(own, names)
+        self.assertNotIn('aggregate.json', names)
+
+    def test_reused_pid_gets_own_file(self):
+        first = metrics.Worker(self.directory)
+        second = metrics.Worker(self.directory)
+        self.assertEqual(first.pid, second.pid)
+        self.assertNotEqual(first.path, second.path)
+        first.close()
+        second.close()
+
+    def test_scrape_needs_token_or_staff(self):
+        url = reverse('metrics')
+        remote = {'REMOTE_ADDR': '203.0.113.5'}
+        self.assertEqual(self.client.get(url, **remote).status_code, 403)
+        # За обратным прокси все запросы приходят с 127.0.0.1.
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1')
+                         .status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=('203.0.113.5',)):
+            self.assertEqual(self.client.get(url, **remote).status_code, 200)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret',
+                                   **remote)
+        self.assertEqual(response.status_code, 200)
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url, **remote).status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', '', ('view',),
+                                      buckets=(1, 2))
+        histogram.observe(0.5, 'a')
+        histogram.observe(1.5, 'a')
+        histogram.observe(3, 'a')
+        lines = list(histogram.exposition(histogram.values))
+        self.assertEqual(lines, [
+            'test_seconds_bucket{view="a",le="1"} 1',
+            'test_seconds_bucket{view="a",le="2"} 2',
+            'test_seconds_bucket{view="a",le="+Inf"} 3',
+            'test_seconds_count{view="a"} 3',
+            'test_seconds_sum{view="a"} 5.0',
+        ])
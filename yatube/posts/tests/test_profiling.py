@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        for _ in range(10):
+            Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(PROFILER_DIR=self.directory,
+                                          PROFILER_TOKEN='secret',
+                                          PROFILER_INTERVAL=0.0005)
+        self.settings.enable()
+        self.client = Client()
+        cache.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def profiles(self):
+        return os.listdir(self.directory)
+
+    def test_profile_by_header(self):
+        response = self.client.get(reverse('index'), HTTP_X_PROFILE='secret')
+        timing = response['Server-Timing']
+        for name in ('total', 'db', 'template', 'cache', 'python'):
+            self.assertIn(f'{name};dur=', timing)
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('-index-', profiles[0])
+        self.assertTrue(profiles[0].endswith('.collapsed'))
+        with open(os.path.join(self.directory, profiles[0])) as source:
+            for line in source:
+                stack, count = line.rsplit(' ', 1)
+                self.assertTrue(count.strip().isdigit())
+
+    def test_not_profiled_by_default(self):
+        response = self.client.get(reverse('index'), HTTP_X_PROFILE='wrong')
+        self.assertNotIn('Server-Timing', response)
+        response = self.client.get(reverse('index'), {'profile': 1})
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.profiles(), [])
+
+    def test_profile_flag_for_staff(self):
+        self.client.force_login(ProfilerTests.staff)
+        response = self.client.get(reverse('index'), {'profile': 1})
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(len(self.profiles()), 1)
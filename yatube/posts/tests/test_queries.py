@@ -0,0 +1,55 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Post, Group, User, Follow, Comment
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.authors = [User.objects.create(username=f'author{i}')
+                       for i in range(3)]
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+            for _ in range(4):
+                post = Post.objects.create(text='Текст', author=author,
+                                           group=cls.group)
+                Comment.objects.create(text='Комментарий', author=cls.user,
+                                       post=post)
+        cls.post = post
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.user)
+        cache.clear()
+
+    def test_views_stay_within_budget(self):
+        author = QueryBudgetTests.authors[-1].username
+        urls = [
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': author}),
+            reverse('post', kwargs={'username': author,
+                                    'post_id': QueryBudgetTests.post.id}),
+            reverse('follow_index'),
+            reverse('new_post'),
+            reverse('post_edit', kwargs={'username': author,
+                                         'post_id': QueryBudgetTests.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.authorized_client, url)
+
+    @override_settings(DEBUG=True)
+    def test_report_header_in_debug(self):
+        response = self.authorized_client.get(reverse('follow_index'))
+        report = json.loads(response['X-Query-Report'])
+        self.assertEqual(report['url_name'], 'follow_index')
+        self.assertEqual(report['repeated'], [])
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Post, Group, User, Follow, Comment
+
+
+class QueryPlanTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for _ in range(12):
+            post = Post.objects.create(text='Текст', author=cls.author,
+                                       group=cls.group)
+            Comment.objects.create(text='Комментарий', author=cls.user,
+                                   post=post)
+        cls.post = post
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryPlanTests.user)
+        cache.clear()
+
+    def test_feed_queries_use_indexes(self):
+        post = QueryPlanTests.post
+        urls = [
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': 'admin2'}),
+            reverse('post', kwargs={'username': 'admin2',
+                                    'post_id': post.id}),
+            reverse('post_comments', kwargs={'username': 'admin2',
+                                             'post_id': post.id}),
+            reverse('follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assertIndexedQueries(
+                    self.authorized_client, url)
+                paginator = getattr(response.context.get('page'),
+                                    'paginator', None)
+                if paginator is not None and paginator.next_cursor:
+                    self.assertIndexedQueries(
+                        self.authorized_client,
+                        url + '?cursor=' + paginator.next_cursor)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_follow_with_celebrity_uses_indexes(self):
+        other = User.objects.create(username='admin3')
+        Follow.objects.create(user=QueryPlanTests.user, author=other)
+        for _ in range(12):
+            Post.objects.create(text='Текст', author=other)
+        url = reverse('follow_index')
+        response = self.assertIndexedQueries(self.authorized_client, url)
+        cursor = response.context['page'].paginator.next_cursor
+        self.assertIndexedQueries(self.authorized_client,
+                                  url + '?cursor=' + cursor)
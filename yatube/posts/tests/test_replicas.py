@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, Client, override_settings
+from django.urls import reverse
+
+from core import replicas
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS={'replica': 1})
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика — отдельный файл SQLite, в который копируется
+        # основная база.
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases['replica'] = dict(
+            connections.databases['default'], NAME=cls.replica_path)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        self.author = User.objects.create(username='admin1')
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.replicate()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        cache.clear()
+
+    def replicate(self):
+        connections['replica'].close()
+        source = connections['default']
+        source.ensure_connection()
+        with sqlite3.connect(self.replica_path) as target:
+            source.connection.backup(target)
+
+    def test_reads_go_to_replica(self):
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(reverse('index'))
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertEqual(response.context['page'][0].text, 'Старый пост')
+        self.assertIsNone(replicas.current_replica())
+
+    def test_read_your_writes(self):
+        response = self.authorized_client.post(reverse('new_post'),
+                                               {'text': 'Новый пост'})
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertEqual(response.context['page'][0].text, 'Новый пост')
+
+    def test_reads_without_writes_do_not_pin(self):
+        response = self.authorized_client.get(reverse('index'))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS={'replica': 3, 'default': 1})
+    def test_weighted_choice(self):
+        picks = Counter(replicas.choose_replica() for _ in range(400))
+        self.assertGreater(picks['replica'], picks['default'])
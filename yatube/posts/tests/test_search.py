@@ -0,0 +1,67 @@
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User, Comment
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.post = Post.objects.create(
+            text='Красивые книги о программировании',
+            author=SearchTests.user)
+        cls.other_post = Post.objects.create(
+            text='Заметки про погоду', author=SearchTests.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_stemmed_match(self):
+        posts, _ = search.search('красивая книга')
+        self.assertEqual(posts, [SearchTests.post])
+
+    def test_comment_matches_post(self):
+        Comment.objects.create(text='Отличная книга', author=SearchTests.user,
+                               post=SearchTests.other_post)
+        posts, _ = search.search('отличный')
+        self.assertEqual(posts, [SearchTests.other_post])
+
+    def test_deleted_post_leaves_index(self):
+        Post.objects.get(pk=SearchTests.other_post.pk).delete()
+        posts, _ = search.search('погода')
+        self.assertEqual(posts, [])
+
+    def test_cursor_pages(self):
+        for _ in range(3):
+            Post.objects.create(text='Книга', author=SearchTests.user)
+        first, cursor = search.search('книга', limit=2)
+        second, last_cursor = search.search('книга', cursor, limit=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertFalse(set(first) & set(second))
+
+    def test_rebuild_command(self):
+        Post.objects.filter(pk=SearchTests.post.pk).update(text='Новый текст')
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        posts, _ = search.search('новый')
+        self.assertEqual(posts, [SearchTests.post])
+
+    def test_search_page(self):
+        response = self.guest_client.get(reverse('search'), {'q': 'погоды'})
+        self.assertEqual(list(response.context['posts']),
+                         [SearchTests.other_post])
+
+    def test_broken_cursor_returns_first_page(self):
+        for cursor in ('WzEsIDFlOTk5XQ', search.encode_cursor(1, 10 ** 26),
+                       search.encode_cursor('x', 1), '!'):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('search'), {'q': 'погоды', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['posts']),
+                                 [SearchTests.other_post])
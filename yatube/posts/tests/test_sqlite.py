@@ -0,0 +1,63 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase
+
+from core import sqlite
+
+
+class SQLiteTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def file_connection(self):
+        wrapper = DatabaseWrapper(
+            dict(connection.settings_dict, NAME=self.path), alias='file')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_on_new_connection(self):
+        wrapper = self.file_connection()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64 * 1024)
+
+    def test_pragmas_not_recorded(self):
+        wrapper = self.file_connection()
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with wrapper.execute_wrapper(record):
+            self.pragma(wrapper, 'synchronous')
+        self.assertEqual(queries, ['PRAGMA synchronous'])
+
+    def test_replaced_file_is_unhealthy(self):
+        wrapper = self.file_connection()
+        wrapper.ensure_connection()
+        self.assertTrue(sqlite.healthy(wrapper))
+        restored = os.path.join(self.directory, 'restored.sqlite3')
+        sqlite3.connect(restored).close()
+        os.replace(restored, self.path)
+        self.assertFalse(sqlite.healthy(wrapper))
+
+    def test_memory_database_always_healthy(self):
+        connection.ensure_connection()
+        self.assertTrue(sqlite.healthy(connection))
@@ -0,0 +1,59 @@
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Group, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class StreamingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.group = Group.objects.create(title='Тест', slug='test',
+                                         description='Описание')
+        for i in range(15):
+            Post.objects.create(text=f'Пост номер {i}', author=cls.user,
+                                group=cls.group)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def assertSameAsRendered(self, url):
+        rendered = self.client.get(url).content.decode()
+        with override_settings(STREAM_FEEDS=True):
+            response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 12)
+        self.assertIn('<html', chunks[0])
+        streamed = ''.join(chunks)
+        for i in range(5, 15):
+            self.assertIn(f'Пост номер {i}', streamed)
+        self.assertIn('cursor=', streamed)
+        # Разметка совпадает с обычной отдачей с точностью до пробелов.
+        self.assertEqual(streamed.split(), rendered.split())
+
+    def test_index(self):
+        self.assertSameAsRendered(reverse('index'))
+
+    @override_settings(STREAM_CHUNK_SIZE=4)
+    def test_profile_atom(self):
+        response = self.client.get(reverse('profile_atom', args=['admin1']))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'],
+                         'application/atom+xml; charset=utf-8')
+        feed = ElementTree.fromstring(b''.join(response.streaming_content))
+        entries = feed.findall(f'{ATOM}entry')
+        self.assertEqual(len(entries), 15)
+        self.assertEqual(entries[0].find(f'{ATOM}summary').text,
+                         'Пост номер 14')
+        self.assertEqual(entries[0].find(f'{ATOM}category').get('term'),
+                         'Тест')
+        self.assertEqual(feed.find(f'{ATOM}updated').text,
+                         entries[0].find(f'{ATOM}published').text)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.backends import DjangoTemplates
+from posts.models import Post, User
+
+
+class TemplateCacheTests(TestCase):
+    def test_warm_fills_cached_loader(self):
+        engine = DjangoTemplates({
+            'NAME': 'warm',
+            'DIRS': [settings.TEMPLATES_DIR],
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': [('django.template.loaders.cached.Loader',
+                                     settings.TEMPLATE_LOADERS)]},
+        })
+        self.assertGreater(engine.warm(), 0)
+        loader = engine.engine.template_loaders[0]
+        for name in ('base.html', 'posts/index.html', 'paginator.html'):
+            self.assertIn(name, loader.get_template_cache)
+
+    def test_cards_show_edit_link_to_author(self):
+        cache.clear()
+        author = User.objects.create(username='admin1')
+        post = Post.objects.create(text='Текст', author=author)
+        edit = reverse('post_edit', args=['admin1', post.id])
+        client = Client()
+        self.assertNotContains(client.get(reverse('index')), edit)
+        client.force_login(author)
+        for url in (reverse('index'), reverse('profile', args=['admin1']),
+                    reverse('post', args=['admin1', post.id])):
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), edit)
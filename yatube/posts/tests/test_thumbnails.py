@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+
+def make_image(name='image.png', size=(50, 40)):
+    buffer = BytesIO()
+    Image.new('RGBA', size=size, color=(255, 0, 0)).save(buffer, 'png')
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type='image/png')
+
+
+_build = thumbnails.build
+
+
+def crashing_build(post_id, image_name):
+    # Процесс пула падает целиком, как при нехватке памяти.
+    if 'crash' in image_name:
+        os._exit(1)
+    return _build(post_id, image_name)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+                   THUMBNAIL_WORKERS=2)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='admin1')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailTests.user)
+        cache.clear()
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_thumbnail_built_on_upload(self):
+        self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Текст', 'image': make_image()},
+        )
+        post = Post.objects.get(text='Текст')
+
+        self.assertTrue(post.thumbnail)
+        self.assertTrue(default_storage.exists(post.thumbnail.name))
+        with default_storage.open(post.thumbnail.name) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size,
+                             settings.POST_THUMBNAIL_SIZE)
+        self.assertEqual((post.image_width, post.image_height), (50, 40))
+        self.assertEqual(post.image_format, 'png')
+        self.assertEqual(post.image_bytes, post.image.size)
+        self.assertTrue(post.image_preview.startswith(
+            'data:image/jpeg;base64,'))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, post.thumbnail.url)
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, post.image_preview)
+
+    def test_placeholder_until_thumbnail_ready(self):
+        self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Текст', 'image': make_image()},
+        )
+        post = Post.objects.get(text='Текст')
+
+        self.assertFalse(post.thumbnail)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'card-img bg-light')
+
+    def test_backfill_command(self):
+        posts = [Post.objects.create(text='Текст', author=ThumbnailTests.user,
+                                     image=make_image(size=(50 + i, 40)))
+                 for i in range(3)]
+        Post.objects.create(text='Без картинки', author=ThumbnailTests.user)
+        call_command('build_thumbnails', workers=2, stdout=StringIO())
+        for i, post in enumerate(posts):
+            post.refresh_from_db()
+            self.assertTrue(default_storage.exists(post.thumbnail.name))
+            self.assertEqual((post.image_width, post.image_height),
+                             (50 + i, 40))
+            self.assertEqual(post.image_format, 'png')
+
+    def test_job_keeps_storage_of_schedule_time(self):
+        location = default_storage.location
+        storage = thumbnails._snapshot(default_storage)
+        with override_settings(MEDIA_ROOT=tempfile.gettempdir()):
+            self.assertNotEqual(default_storage.location, location)
+            self.assertEqual(storage.location, location)
+
+    def test_settings_change_waits_for_jobs(self):
+        generate = mock.Mock(side_effect=lambda *args: time.sleep(0.1))
+        with mock.patch.object(thumbnails, 'generate', generate):
+            thumbnails._submit(1, default_storage)
+            with override_settings(MEDIA_ROOT=tempfile.gettempdir()):
+                self.assertFalse(thumbnails._pending)
+        generate.assert_called_once_with(1, default_storage)
+
+    def test_backfill_command_survives_bad_images(self):
+        small = Post.objects.create(text='Текст', author=ThumbnailTests.user,
+                                    image=make_image(size=(30, 30)))
+        Post.objects.create(text='Бомба', author=ThumbnailTests.user,
+                            image=make_image(size=(100, 100)))
+        stderr = StringIO()
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            call_command('build_thumbnails', workers=1, batch_size=1,
+                         stdout=StringIO(), stderr=stderr)
+        self.assertIn('DecompressionBombError', stderr.getvalue())
+        small.refresh_from_db()
+        self.assertTrue(small.thumbnail)
+
+    def test_backfill_command_replaces_broken_pool(self):
+        Post.objects.create(text='Падение', author=ThumbnailTests.user,
+                            image=make_image(name='crash.png'))
+        post = Post.objects.create(text='Текст', author=ThumbnailTests.user,
+                                   image=make_image())
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch.object(thumbnails, 'build', crashing_build):
+            call_command('build_thumbnails', workers=1, batch_size=1,
+                         stdout=stdout, stderr=stderr)
+        self.assertIn('BrokenProcessPool', stderr.getvalue())
+        self.assertIn('ошибок: 1', stdout.getvalue())
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
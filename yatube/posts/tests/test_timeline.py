@@ -0,0 +1,116 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User, Follow, TimelineEntry
+from posts import timeline
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.other_reader = User.objects.create(username='other_reader')
+        cls.author = User.objects.create(username='author')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TimelineTests.reader)
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        post = Post.objects.create(text='Текст', author=TimelineTests.author)
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTests.reader, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=TimelineTests.other_reader).exists())
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        Post.objects.create(text='Текст', author=TimelineTests.author)
+        follow = Follow.objects.create(user=TimelineTests.reader,
+                                       author=TimelineTests.author)
+        self.assertEqual(TimelineTests.reader.timeline.count(), 1)
+
+        follow.delete()
+        self.assertEqual(TimelineTests.reader.timeline.count(), 0)
+
+    def test_deleted_post_leaves_timeline(self):
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        post = Post.objects.create(text='Текст', author=TimelineTests.author)
+        post.delete()
+        self.assertEqual(TimelineTests.reader.timeline.count(), 0)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_celebrity_posts_are_pulled(self):
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        Follow.objects.create(user=TimelineTests.other_reader,
+                              author=TimelineTests.author)
+        post = Post.objects.create(text='Текст', author=TimelineTests.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, timeline.page(TimelineTests.reader))
+
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['page']), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2, POSTS_PER_PAGE=3)
+    def test_celebrity_posts_merge_with_timeline(self):
+        regular = User.objects.create(username='regular')
+        Follow.objects.create(user=TimelineTests.reader, author=regular)
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        # Пост, разложенный до того, как автор стал знаменитостью,
+        # есть и в ленте, и в выборке по автору.
+        early = Post.objects.create(text='Текст', author=TimelineTests.author)
+        Follow.objects.create(user=TimelineTests.other_reader,
+                              author=TimelineTests.author)
+        posts = [early]
+        for i in range(6):
+            author = regular if i % 2 else TimelineTests.author
+            posts.append(Post.objects.create(text='Текст', author=author))
+        expected = sorted(posts, key=lambda post: (post.pub_date, post.pk),
+                          reverse=True)
+
+        seen, cursor = [], None
+        while True:
+            page = timeline.page(TimelineTests.reader, cursor)
+            seen.extend(page)
+            cursor = page.paginator.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        previous = timeline.page(TimelineTests.reader,
+                                 page.paginator.previous_cursor)
+        self.assertEqual(list(previous), expected[3:6])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_former_celebrity_posts_are_fanned_out(self):
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        follow = Follow.objects.create(user=TimelineTests.other_reader,
+                                       author=TimelineTests.author)
+        post = Post.objects.create(text='Текст', author=TimelineTests.author)
+
+        follow.delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTests.reader, post=post).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=3)
+    def test_former_celebrity_backfill_is_one_insert(self):
+        third = User.objects.create(username='third')
+        for user in (TimelineTests.reader, TimelineTests.other_reader, third):
+            Follow.objects.create(user=user, author=TimelineTests.author)
+        Post.objects.create(text='Текст', author=TimelineTests.author)
+        follow = Follow.objects.get(user=third)
+        follow.delete()
+        TimelineEntry.objects.all().delete()
+
+        # Удаление, счётчик и одна вставка — сколько бы ни было
+        # подписчиков.
+        with self.assertNumQueries(3):
+            timeline.follow_removed(follow)
+        self.assertEqual(TimelineEntry.objects.count(), 2)
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import counters, etags, feeds, search
+from posts.models import Post, Group, User, Follow, Comment, TimelineEntry
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.group = Group.objects.create(title='Тест', slug='test',
+                                         description='Описание')
+        cls.post = Post.objects.create(text='Котики, кошки', author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(text='Комментарий', author=cls.user,
+                               post=cls.post)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def assertImported(self, fmt, *options):
+        call_command('export_data', self.directory, '--format', fmt,
+                     stdout=StringIO())
+        Follow.objects.all().delete()
+        call_command('import_data', self.directory, '--format', fmt,
+                     '--batch-size', '1', *options, stdout=StringIO())
+
+        copy = Post.objects.exclude(pk=TransferTests.post.pk).get()
+        self.assertEqual(copy.text, TransferTests.post.text)
+        self.assertEqual(copy.pub_date, TransferTests.post.pub_date)
+        self.assertEqual(copy.author, TransferTests.author)
+        self.assertEqual(copy.group, TransferTests.group)
+        self.assertEqual(copy.comments.get().author, TransferTests.user)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertTrue(Follow.objects.filter(
+            user=TransferTests.user, author=TransferTests.author).exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TransferTests.user, post=copy).exists())
+        self.assertEqual(counters.recount(), 0)
+        found, _ = search.search('котик')
+        self.assertIn(copy, found)
+
+    def test_ndjson(self):
+        counters.stats_for(TransferTests.author.id)
+        self.assertImported('ndjson')
+
+    def test_csv_with_deferred_maintenance(self):
+        self.assertImported('csv', '--defer-maintenance')
+
+    def test_creates_missing_users(self):
+        call_command('export_data', self.directory, stdout=StringIO())
+        User.objects.filter(username='admin2').update(username='renamed')
+        call_command('import_data', self.directory, stdout=StringIO())
+        author = User.objects.get(username='admin2')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(author.posts.count(), 1)
+
+    def test_invalidates_stamp_and_feeds(self):
+        Comment.objects.create(text='Без поста', author=TransferTests.user)
+        self.client.get(reverse('index_feed', args=['atom']))
+        stamp = etags.changed_at()
+        call_command('export_data', self.directory, stdout=StringIO())
+        call_command('import_data', self.directory, stdout=StringIO())
+        self.assertNotEqual(etags.changed_at(), stamp)
+        self.assertIsNone(cache.get(feeds.feed_key('index', 'all', 'atom')))
+        self.assertEqual(
+            Comment.objects.filter(text='Без поста', post=None).count(), 2)
+        response = self.client.get(reverse('index_feed', args=['atom']))
+        self.assertEqual(response.content.count(b'<entry>'), 2)
@@ -5,6 +5,7 @@ from django import forms
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from core.paginator import dump_cursor
 from posts.models import Post, Group, User, Follow, Comment
 
 import shutil
@@ -72,8 +73,51 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context['page'].object_list), 10)
 
     def test_second_page_contains_three_records(self):
-        response = self.authorized_client.get(reverse('index') + '?page=2')
+        response = self.authorized_client.get(reverse('index'))
+        cursor = response.context['page'].paginator.next_cursor
+        response = self.authorized_client.get(
+            reverse('index') + '?cursor=' + cursor)
         self.assertEqual(len(response.context['page'].object_list), 3)
+        self.assertFalse(response.context['page'].has_next())
+
+    def test_previous_cursor_returns_first_page(self):
+        first = self.authorized_client.get(reverse('index'))
+        cursor = first.context['page'].paginator.next_cursor
+        second = self.authorized_client.get(
+            reverse('index') + '?cursor=' + cursor)
+        cursor = second.context['page'].paginator.previous_cursor
+        response = self.authorized_client.get(
+            reverse('index') + '?cursor=' + cursor)
+
+        self.assertEqual(list(response.context['page']),
+                         list(first.context['page']))
+        self.assertFalse(response.context['page'].has_previous())
+
+    def test_cursor_pages_do_not_skip_equal_dates(self):
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.authorized_client.get(
+                reverse('index') + '?cursor=' + cursor)
+            seen.extend(post.id for post in response.context['page'])
+            cursor = response.context['page'].paginator.next_cursor
+        self.assertEqual(sorted(seen), sorted(
+            Post.objects.values_list('id', flat=True)))
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.authorized_client.get(reverse('index') + '?cursor=!')
+        self.assertEqual(len(response.context['page'].object_list), 10)
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        date = Post.objects.first().pub_date.isoformat()
+        for values in ([date, 1e999], [date, 10 ** 26], [date, -10 ** 26]):
+            with self.subTest(values=values):
+                cursor = dump_cursor([0, values])
+                response = self.authorized_client.get(
+                    reverse('index') + '?cursor=' + cursor)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['page'].has_previous())
 
 
 class GrouppagesTests(TestCase):
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters, search, writebehind
+from posts.models import (AppliedJournal, Comment, Follow, Post,
+                          TimelineEntry, User)
+
+
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.settings = override_settings(WRITE_BEHIND=True,
+                                         WRITE_BEHIND_DIR=cls.directory,
+                                         WRITE_BEHIND_INTERVAL=3600,
+                                         WRITE_BEHIND_BATCH_SIZE=500)
+        cls.settings.enable()
+        cls.user = User.objects.create(username='admin1')
+        cls.author = User.objects.create(username='admin2')
+        cls.post = Post.objects.create(text='Текст', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(WriteBehindTests.user)
+        cache.clear()
+
+    def tearDown(self):
+        writebehind.flush()
+
+    def journals(self):
+        return [name for name in os.listdir(self.directory)
+                if name.endswith(writebehind.SUFFIX)]
+
+    def test_comment_journaled_then_flushed(self):
+        url = reverse('add_comment', args=['admin2', self.post.id])
+        for i in range(3):
+            response = self.client.post(url, {'text': f'Комментарий {i}'})
+            self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.exists())
+        with open(os.path.join(self.directory, self.journals()[0])) as source:
+            self.assertEqual(len(source.readlines()), 3)
+        self.assertEqual(writebehind.flush(), 3)
+        comments = list(Comment.objects.order_by('pk'))
+        self.assertEqual([comment.text for comment in comments],
+                         [f'Комментарий {i}' for i in range(3)])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 3)
+        self.assertEqual(self.journals(), [])
+        self.assertFalse(AppliedJournal.objects.exists())
+
+    @override_settings(WRITE_BEHIND_BATCH_SIZE=2)
+    def test_flush_on_batch_size(self):
+        counters.stats_for(self.user.id)
+        url = reverse('profile_follow', args=['admin2'])
+        self.client.get(url)
+        self.assertFalse(Follow.objects.exists())
+        self.client.get(url)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(counters.stats_for(self.user.id).following_count, 1)
+
+    def test_unfollow_after_queued_follow(self):
+        self.client.get(reverse('profile_follow', args=['admin2']))
+        self.client.get(reverse('profile_unfollow', args=['admin2']))
+        self.assertFalse(Follow.objects.exists())
+
+    def write_orphan(self, name, records):
+        path = os.path.join(self.directory, name + writebehind.SUFFIX)
+        with open(path, 'w') as target:
+            for record in records:
+                target.write(json.dumps(record) + '\n')
+            target.write('{"model": "comm')
+
+    def test_replay_orphan_once(self):
+        record = {'model': 'comment', 'post': self.post.id,
+                  'author': self.user.id, 'text': 'Из журнала'}
+        self.write_orphan('1-orphan', [record])
+        self.assertEqual(writebehind.replay(), 1)
+        self.assertEqual(self.journals(), [])
+        self.write_orphan('1-orphan', [record])
+        AppliedJournal.objects.create(name='1-orphan')
+        self.assertEqual(writebehind.replay(), 0)
+        self.assertEqual(Comment.objects.filter(text='Из журнала').count(), 1)
+        self.assertEqual(self.journals(), [])
+
+    def test_batch_maintained_in_bulk(self):
+        readers = [User.objects.create(username=f'reader{i}')
+                   for i in range(5)]
+        for reader in readers:
+            writebehind.add(Follow(user=reader, author=self.author))
+            writebehind.add(Comment(post=self.post, author=reader,
+                                    text='Пачкой'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(writebehind.flush(), 10)
+        # Число запросов не растёт с размером пачки.
+        self.assertLess(len(queries), 25)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
+        self.assertEqual(counters.stats_for(self.author.id).followers_count,
+                         5)
+        self.assertEqual(set(TimelineEntry.objects.filter(
+            post=self.post).values_list('user_id', flat=True)),
+            {reader.id for reader in readers})
+        if search.available():
+            posts, _ = search.search('Пачкой')
+            self.assertEqual(posts, [self.post])
+
+    def test_start_replays_orphans(self):
+        record = {'model': 'comment', 'post': self.post.id,
+                  'author': self.user.id, 'text': 'При запуске'}
+        self.write_orphan('1-orphan', [record])
+        with mock.patch.object(writebehind, '_started', False), \
+                mock.patch.object(writebehind, '_run'):
+            writebehind.start()
+        self.assertTrue(Comment.objects.filter(text='При запуске').exists())
+        self.assertEqual(self.journals(), [])
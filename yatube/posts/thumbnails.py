@@ -0,0 +1,176 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+Миниатюра строится один раз после загрузки картинки в пуле потоков
+процесса, сохраняется по детерминированному пути и записывается
+в Post.thumbnail. Заодно, за то же открытие файла, в Post пишутся
+размеры, формат и вес картинки и крошечное превью в data URI.
+Шаблоны только выводят готовые значения и не читают файлы.
+
+Задача пула получает хранилище, снятое в момент постановки: путь
+FileSystemStorage читается из MEDIA_ROOT лениво, и без этого задача,
+пережившая смену настроек, писала бы в чужой каталог.
+"""
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from . import cards, etags
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def thumbnail_name(post_id, image_name):
+    width, height = settings.POST_THUMBNAIL_SIZE
+    digest = hashlib.md5(image_name.encode()).hexdigest()[:8]
+    return f'thumbs/posts/{post_id}_{width}x{height}_{digest}.jpg'
+
+
+def _jpeg(image, quality):
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def render(data):
+    """
+    Миниатюра и сведения о картинке за одно декодирование файла.
+    """
+    with Image.open(BytesIO(data)) as image:
+        info = {
+            'image_width': image.width,
+            'image_height': image.height,
+            'image_format': (image.format or '').lower(),
+            'image_bytes': len(data),
+        }
+        image = image.convert('RGB')
+    thumbnail = ImageOps.fit(image, settings.POST_THUMBNAIL_SIZE,
+                             Image.LANCZOS)
+    size = settings.IMAGE_PREVIEW_SIZE
+    image.thumbnail((size, size))
+    info['image_preview'] = 'data:image/jpeg;base64,' + base64.b64encode(
+        _jpeg(image, 50)).decode()
+    return _jpeg(thumbnail, 85), info
+
+
+def build(post_id, image_name, storage=default_storage):
+    """
+    Сохраняет миниатюру, возвращает её имя и сведения о картинке.
+    Базу не трогает, поэтому годится для пула процессов.
+    """
+    with storage.open(image_name, 'rb') as source:
+        content, info = render(source.read())
+    name = thumbnail_name(post_id, image_name)
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content)), info
+
+
+def store(post_id, image_name, name, info):
+    # Картинку могли заменить, пока строилась миниатюра.
+    if Post.objects.filter(pk=post_id, image=image_name).update(
+            thumbnail=name, **info):
+        cards.bump('post', post_id)
+        etags.posts_changed([post_id])
+        return True
+    return False
+
+
+def generate(post_id, storage=default_storage):
+    post = Post.objects.filter(pk=post_id).only('id', 'image').first()
+    if post is None or not post.image:
+        return None
+    try:
+        name, info = build(post_id, post.image.name, storage)
+    except (OSError, ValueError) as error:
+        logger.warning('Thumbnail for post %s failed: %s', post_id, error)
+        return None
+    store(post_id, post.image.name, name, info)
+    return name
+
+
+def reset(post):
+    """
+    Забывает миниатюру и сведения о прежней картинке поста.
+    """
+    post.thumbnail = None
+    post.image_width = post.image_height = post.image_bytes = None
+    post.image_format = post.image_preview = ''
+
+
+def _snapshot(storage):
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemStorage(
+            location=storage.location, base_url=storage.base_url,
+            file_permissions_mode=storage.file_permissions_mode,
+            directory_permissions_mode=storage.directory_permissions_mode)
+    return storage
+
+
+def _run(post_id, storage):
+    try:
+        generate(post_id, storage)
+    except Exception:
+        logger.exception('Thumbnail for post %s failed', post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """
+    Ставит построение миниатюры в очередь после коммита транзакции.
+    При THUMBNAIL_WORKERS = 0 миниатюра строится сразу.
+    """
+    if not post.image:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        generate(post.pk)
+        return
+    post_id, storage = post.pk, _snapshot(post.image.storage)
+    transaction.on_commit(lambda: _submit(post_id, storage))
+
+
+def _submit(post_id, storage):
+    future = _get_executor().submit(_run, post_id, storage)
+    with _executor_lock:
+        _pending.add(future)
+    future.add_done_callback(_done)
+
+
+def _done(future):
+    with _executor_lock:
+        _pending.discard(future)
+
+
+def drain(timeout=None):
+    """
+    Дожидается поставленных миниатюр.
+    """
+    with _executor_lock:
+        pending = list(_pending)
+    wait(pending, timeout)
@@ -0,0 +1,163 @@
+"""
+Материализованная лента подписок.
+
+Посты обычных авторов раскладываются по лентам подписчиков при записи
+(fan-out on write). Посты авторов, у которых подписчиков не меньше
+TIMELINE_FANOUT_LIMIT, в ленты не копируются и подмешиваются при чтении.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F
+
+from core.paginator import CursorPaginator
+
+from .counters import stats_for
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def is_celebrity(author_id):
+    followers = stats_for(author_id).followers_count
+    return followers >= settings.TIMELINE_FANOUT_LIMIT
+
+
+def celebrities_followed_by(user):
+    return list(
+        UserStats.objects.filter(
+            user__following__user=user,
+            followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post.id,
+                      pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def _insert_from(rows):
+    """
+    Раскладывает строки (user_id, post_id, pub_date) запроса по лентам
+    одним INSERT ... SELECT, пропуская уже разложенные.
+    """
+    sql, params = rows.order_by().query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{TimelineEntry._meta.db_table} (user_id, post_id, pub_date) '
+            f'{sql} {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params)
+
+
+def _followers_rows(posts):
+    return posts.filter(author__following__isnull=False).values_list(
+        'author__following__user_id', 'id', 'pub_date')
+
+
+def backfill(user_id, author_id):
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date')
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def rebuild():
+    """
+    Заново строит все ленты по подпискам одним INSERT ... SELECT.
+    """
+    TimelineEntry.objects.all().delete()
+    celebrities = Follow.objects.order_by().values('author').annotate(
+        total=Count('pk')).filter(
+            total__gte=settings.TIMELINE_FANOUT_LIMIT).values('author')
+    _insert_from(_followers_rows(
+        Post.objects.exclude(author__in=celebrities)))
+
+
+def follow_added(follow):
+    if not is_celebrity(follow.author_id):
+        backfill(follow.user_id, follow.author_id)
+
+
+def follows_added(follows):
+    """
+    Раскладывает посты авторов по лентам новых подписчиков: один
+    INSERT ... SELECT на автора, а не на подписку.
+    """
+    readers = defaultdict(set)
+    for follow in follows:
+        readers[follow.author_id].add(follow.user_id)
+    for author_id, user_ids in readers.items():
+        if not is_celebrity(author_id):
+            _insert_from(Post.objects.filter(
+                author_id=author_id, author__following__user_id__in=user_ids,
+            ).values_list('author__following__user_id', 'id', 'pub_date'))
+
+
+def follow_removed(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+    # Автор только что перестал быть «знаменитостью»: его посты,
+    # опубликованные в режиме чтения, нужно разложить по лентам всех
+    # подписчиков — одним запросом, а не по запросу на подписчика.
+    # Строку статистики здесь не создаём: автор может удаляться каскадом.
+    remaining = UserStats.objects.filter(
+        user_id=follow.author_id).values_list('followers_count', flat=True)
+    if list(remaining) == [settings.TIMELINE_FANOUT_LIMIT - 1]:
+        _insert_from(_followers_rows(
+            Post.objects.filter(author_id=follow.author_id)))
+
+
+# Порядок ленты: по дате и id поста из записей ленты, это
+# совпадает с индексом (user, -pub_date, -post).
+ORDERING = ('-feed_date', '-feed_post')
+
+
+def _feed(posts):
+    # Записи ленты копируют дату поста, поэтому вне ленты ключ
+    # сортировки — дата и id самого поста.
+    return posts.annotate(feed_date=F('pub_date'), feed_post=F('id'))
+
+
+def page(user, cursor=None):
+    """
+    Страница ленты подписок. Посты «знаменитостей» не разложены по
+    лентам: первые строки после курсора берутся из ленты по индексу
+    (user, -pub_date, -post) и у каждого такого автора по индексу
+    (author, -pub_date, -id), а сливаются в Python, так что чтение
+    не сортирует всю ленту вместе со всеми постами знаменитостей.
+    """
+    posts = Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post'),
+    )
+    paginator = CursorPaginator(posts.select_related('author', 'group'),
+                                settings.POSTS_PER_PAGE, ordering=ORDERING)
+    celebrities = celebrities_followed_by(user)
+    if not celebrities:
+        return paginator.get_page(cursor)
+    sources = [posts] + [_feed(Post.objects.filter(author_id=author_id))
+                         for author_id in celebrities]
+    return paginator.get_merged_page(
+        cursor, sources,
+        _feed(Post.objects.select_related('author', 'group')))
@@ -7,12 +7,22 @@ urlpatterns = [
     path('group/<str:slug>/', views.group_posts, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('hot/', views.hot, name='hot'),
+    path('feeds/index.<str:fmt>', views.index_feed, name='index_feed'),
+    path('feeds/group/<str:slug>.<str:fmt>', views.group_feed,
+         name='group_feed'),
+    path('feeds/author/<str:username>.<str:fmt>', views.author_feed,
+         name='author_feed'),
     path('<str:username>/', views.profile, name='profile'),
+    path('<str:username>/atom/', views.profile_atom, name='profile_atom'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
     path('<str:username>/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('<str:username>/unfollow/', views.profile_unfollow,
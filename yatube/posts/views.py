@@ -1,65 +1,75 @@
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
-from django.views.decorators.cache import cache_page
 
-from .models import Post, Group, User, Comment, Follow
+from core.paginator import CursorPaginator
+from core.replicas import replica_reads
+from core.streaming import stream_page
+
+from .models import Post, Group, GroupStats, User, Follow
 from .forms import PostForm, CommentForm
+from . import counters, etags, search as search_index, thumbnails, timeline
+from . import feeds, group_pages, hot as hot_ranking, writebehind
 
 from django.conf import settings
 
 
+@replica_reads
 @require_http_methods(['GET'])
-@cache_page(20)
+@etags.conditional(lambda: [etags.INDEX])
 def index(request):
-    posts = Post.objects.all()
-    comments = Comment.objects.all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('cursor'))
+    if settings.STREAM_FEEDS:
+        return stream_page(request, 'posts/index.html', {}, page,
+                           'posts/post_item.html')
     return render(
         request,
         'posts/index.html',
-        {
-            'page': page,
-            'comments': comments,
-            'posts': posts,
-        },
+        {'page': page},
     )
 
 
+@replica_reads
 @require_http_methods(['GET'])
+@etags.conditional(lambda slug: [etags.group(slug)])
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()[:10]
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = get_object_or_404(Group.objects.select_related('stats'),
+                              slug=slug)
+    page = group_pages.page(group, request.GET.get('cursor'))
+    try:
+        stats = group.stats
+    except GroupStats.DoesNotExist:
+        stats = counters.group_stats_for(group.pk)
+    context = {'group': group, 'stats': stats}
+    if settings.STREAM_FEEDS:
+        return stream_page(request, 'posts/group.html', context, page,
+                           'posts/post_item.html')
     return render(
         request,
         'posts/group.html',
-        {
-            'group': group,
-            'posts': posts,
-            'page': page,
-        },
+        dict(context, page=page),
     )
 
 
+@replica_reads
 @require_http_methods(['GET'])
+@etags.conditional(lambda username: [etags.author(username)])
 def profile(request, username):
     following = False
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    posts = author.posts.select_related('author', 'group')
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=author).exists()
-    signatories = author.following.all()
-    followers = author.follower.all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('cursor'))
 
     return render(
         request,
@@ -67,20 +77,76 @@ def profile(request, username):
         {
             'author': author,
             'page': page,
-            'signatories': signatories,
-            'followers': followers,
+            'stats': counters.stats_for(author.id),
             'following': following,
-            'posts': posts,
         },
     )
 
 
 @require_http_methods(['GET'])
+def profile_atom(request, username):
+    author = get_object_or_404(User, username=username)
+    feed, entries = feeds.profile_feed(request, author)
+    return StreamingHttpResponse(feed.stream(entries),
+                                 content_type=feed.content_type)
+
+
+def _feed_response(request, kind, name, fmt, build):
+    if fmt not in feeds.FORMATS:
+        raise Http404
+    entry = feeds.cached_feed(request, kind, name, fmt, build)
+    response = HttpResponse(entry['body'],
+                            content_type=feeds.FORMATS[fmt].content_type)
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'],
+        response=response)
+
+
+@replica_reads
+@require_http_methods(['GET'])
+def index_feed(request, fmt):
+    def build():
+        posts = Post.objects.select_related('author', 'group')
+        return 'Последние обновления на сайте', reverse('index'), posts
+
+    return _feed_response(request, 'index', 'all', fmt, build)
+
+
+@replica_reads
+@require_http_methods(['GET'])
+def group_feed(request, slug, fmt):
+    def build():
+        group = get_object_or_404(Group, slug=slug)
+        posts = group.posts.select_related('author', 'group')
+        return group.title, reverse('group_posts', args=[slug]), posts
+
+    return _feed_response(request, 'group', slug, fmt, build)
+
+
+@replica_reads
+@require_http_methods(['GET'])
+def author_feed(request, username, fmt):
+    def build():
+        author = get_object_or_404(User, username=username)
+        posts = author.posts.select_related('author', 'group')
+        title = f'Записи {author.get_full_name() or author.username}'
+        return title, reverse('profile', args=[username]), posts
+
+    return _feed_response(request, 'author', username, fmt, build)
+
+
+@replica_reads
+@require_http_methods(['GET'])
+@etags.conditional(
+    lambda username, post_id: [etags.author(username), etags.post(post_id)])
 def post_view(request, username, post_id):
-    user = get_object_or_404(User, username=username)
-    message = get_object_or_404(Post, id=post_id, author=user)
+    message = get_object_or_404(Post.objects.select_related('author'),
+                                id=post_id, author__username=username)
+    user = message.author
     posts = user.posts.all()
-    comments = message.comments.all()
+    comments = _comments_page(request, message)
     form = CommentForm()
     return render(
         request,
@@ -91,12 +157,76 @@ def post_view(request, username, post_id):
             'add_comment': True,
             'comments': comments,
             'posts': posts,
+            'stats': counters.stats_for(user.id),
             'form': form,
             'post_id': post_id,
         },
     )
 
 
+def _comments_page(request, message):
+    comments = message.comments.select_related('author')
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE,
+                                ordering=('created', 'id'))
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@replica_reads
+@require_http_methods(['GET'])
+@etags.conditional(lambda username, post_id: [etags.post(post_id)])
+def post_comments(request, username, post_id):
+    message = get_object_or_404(Post.objects.select_related('author'),
+                                id=post_id, author__username=username)
+    comments = _comments_page(request, message)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.paginator.next_cursor,
+        })
+    return render(
+        request,
+        'posts/comment_list.html',
+        {'message': message, 'comments': comments},
+    )
+
+
+@replica_reads
+@require_http_methods(['GET'])
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search_index.search(
+        query, request.GET.get('cursor'), settings.POSTS_PER_PAGE)
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'query': query,
+            'posts': posts,
+            'next_cursor': next_cursor,
+        },
+    )
+
+
+@replica_reads
+@require_http_methods(['GET'])
+def hot(request):
+    ids = hot_ranking.top_ids()
+    posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+    return render(
+        request,
+        'posts/hot.html',
+        {'posts': [posts[pk] for pk in ids if pk in posts]},
+    )
+
+
 @require_http_methods(["GET", "POST"])
 @login_required
 def new_post(request):
@@ -105,6 +235,7 @@ def new_post(request):
         new = form.save(commit=False)
         new.author = request.user
         new.save()
+        thumbnails.schedule(new)
         return redirect('index')
     return render(request, 'posts/new_post.html', {'form': form})
 
@@ -112,14 +243,20 @@ def new_post(request):
 @require_http_methods(["GET", "POST"])
 @login_required
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id, author__username=username)
 
     if request.user.username != username:
         return redirect("post", username=post.author, post_id=post_id)
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        post = form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            thumbnails.reset(post)
+        post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect("post", username=post.author, post_id=post_id)
     return render(
         request,
@@ -141,7 +278,10 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
-        form.save()
+        if settings.WRITE_BEHIND:
+            writebehind.add(comment)
+        else:
+            comment.save()
         return redirect('post', post.author, post_id)
     return render(request, 'posts/comments.html', {'form': form,
                                                    'post_id': post_id})
@@ -149,17 +289,17 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = timeline.page(request.user, request.GET.get('cursor'))
     return render(request, 'posts/follow.html', {'page': page})
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if request.user != author:
+    if request.user != author and settings.WRITE_BEHIND:
+        writebehind.add(Follow(author_id=author.id,
+                               user_id=request.user.id))
+    elif request.user != author:
         Follow.objects.get_or_create(author_id=author.id,
                                      user_id=request.user.id)
     return redirect('profile', username)
@@ -169,5 +309,8 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     user = get_object_or_404(User, username=request.user)
+    if settings.WRITE_BEHIND:
+        # Подписка из очереди не должна появиться после отписки.
+        writebehind.flush()
     Follow.objects.filter(user=user, author=author).delete()
     return redirect('profile', username)
@@ -0,0 +1,277 @@
+"""
+Отложенная запись комментариев и подписок.
+
+При WRITE_BEHIND представления не пишут Comment и Follow сами:
+строка добавляется в журнал процесса (файл, запись с fsync) и в
+очередь в памяти, и ответ уходит сразу после записи в журнал. Фоновый
+поток раз в WRITE_BEHIND_INTERVAL секунд, а запрос — при
+WRITE_BEHIND_BATCH_SIZE строках в очереди — пишут очередь в базу одной
+транзакцией через bulk_create и рассылают post_save, поэтому счётчики,
+ленты и индекс обновляются так же, как при обычном save().
+
+Журнал состоит из сегментов. При сбросе текущий сегмент закрывается
+для записи и удаляется после коммита, а его имя сохраняется
+в AppliedJournal в той же транзакции: сегмент, переживший падение
+после коммита, не применится второй раз. Живые сегменты процесс держит
+под flock; сегменты завершившихся процессов переигрываются при первом
+использовании очереди или командой replay_journal.
+
+Счётчики, ленты подписок, поисковый индекс и рейтинг обсуждаемого
+обновляются для всей пачки сразу теми же групповыми функциями, что
+и при загрузке (posts.transfer), а не post_save на каждую строку: под
+блокировкой записи — несколько групповых запросов, метки карточек
+и ETag меняются уже после коммита.
+
+Воркер вызывает start() при запуске (yatube/wsgi.py): сегменты упавших
+процессов применяются до первого запроса, а не при первой записи.
+
+Дата комментария — момент сброса (auto_now_add проставляет её
+в bulk_create), а не момент запроса.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from . import cards, counters, etags, hot, search, timeline
+from .models import AppliedJournal, Comment, Follow, Post, User
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.journal'
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_segment = None
+_sealed = []
+_started = False
+
+
+class Segment:
+    def __init__(self, directory):
+        self.name = f'{os.getpid()}-{uuid.uuid4().hex}'
+        self.path = os.path.join(directory, self.name + SUFFIX)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                          0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        self.records = []
+
+    def append(self, record):
+        os.write(self.fd, json.dumps(record).encode() + b'\n')
+        os.fsync(self.fd)
+        self.records.append(record)
+
+    def discard(self):
+        _discard(self.path, self.name, self.fd)
+
+
+def _discard(path, name, fd):
+    # Файл удаляется раньше, чем снимается блокировка: тот, кто откроет
+    # его в этот момент, увидит st_nlink == 0 и пропустит сегмент.
+    os.remove(path)
+    AppliedJournal.objects.filter(name=name).delete()
+    os.close(fd)
+
+
+def _record(instance):
+    if isinstance(instance, Comment):
+        return {'model': 'comment', 'post': instance.post_id,
+                'author': instance.author_id, 'text': instance.text}
+    if isinstance(instance, Follow):
+        return {'model': 'follow', 'user': instance.user_id,
+                'author': instance.author_id}
+    raise TypeError(f'Отложенная запись не поддерживает {instance!r}')
+
+
+def add(instance):
+    """
+    Записывает несохранённый Comment или Follow в журнал и очередь.
+    """
+    global _segment
+    record = _record(instance)
+    with _lock:
+        _start()
+        if _segment is None:
+            _segment = Segment(settings.WRITE_BEHIND_DIR)
+        _segment.append(record)
+        due = len(_segment.records) >= settings.WRITE_BEHIND_BATCH_SIZE
+    if due:
+        flush()
+
+
+def flush():
+    """
+    Пишет очередь процесса в базу, возвращает число новых строк.
+    """
+    global _segment
+    with _flush_lock:
+        with _lock:
+            if _segment is not None:
+                _sealed.append(_segment)
+                _segment = None
+            pending = list(_sealed)
+        total = 0
+        for segment in pending:
+            total += _apply(segment.name, segment.records)
+            segment.discard()
+            _sealed.remove(segment)
+        return total
+
+
+def replay():
+    """
+    Применяет сегменты завершившихся процессов.
+    """
+    directory = settings.WRITE_BEHIND_DIR
+    os.makedirs(directory, exist_ok=True)
+    total = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(SUFFIX):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        if os.fstat(fd).st_nlink == 0:
+            os.close(fd)
+            continue
+        name = filename[:-len(SUFFIX)]
+        try:
+            total += _apply(name, _read(fd))
+        except Exception:
+            os.close(fd)
+            raise
+        _discard(path, name, fd)
+    return total
+
+
+def _read(fd):
+    records = []
+    with os.fdopen(os.dup(fd), 'rb') as source:
+        for line in source:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Оборванная последняя строка: ответ на этот запрос
+                # не был отправлен.
+                continue
+    return records
+
+
+def _apply(name, records):
+    with transaction.atomic():
+        # Первая запись транзакции берёт блокировку записи SQLite:
+        # дальше никто не пишет, пока пачка не закоммичена.
+        _, created = AppliedJournal.objects.get_or_create(name=name)
+        if not created:
+            return 0
+        users = set(User.objects.filter(pk__in={
+            record[key] for record in records
+            for key in ('user', 'author') if key in record
+        }).values_list('pk', flat=True))
+        comments = _insert_comments(
+            [record for record in records if record['model'] == 'comment'],
+            users)
+        follows = _insert_follows(
+            [record for record in records if record['model'] == 'follow'],
+            users)
+        _maintain(comments, follows)
+    return len(comments) + len(follows)
+
+
+def _maintain(comments, follows):
+    counters.imported(comments=comments, follows=follows)
+    timeline.follows_added(follows)
+    search.index_many(search.COMMENT, comments)
+    hot.comments_added(comments)
+    post_ids = {comment.post_id for comment in comments}
+    user_ids = {pk for follow in follows
+                for pk in (follow.user_id, follow.author_id)}
+    transaction.on_commit(lambda: _invalidate(post_ids, user_ids))
+
+
+def _invalidate(post_ids, user_ids):
+    cards.bump_many('post', post_ids)
+    etags.posts_changed(post_ids)
+    etags.users_changed(user_ids)
+
+
+def _insert_comments(records, users):
+    posts = set(Post.objects.filter(
+        pk__in={record['post'] for record in records}
+    ).values_list('pk', flat=True))
+    comments = [Comment(post_id=record['post'], author_id=record['author'],
+                        text=record['text'])
+                for record in records
+                if record['post'] in posts and record['author'] in users]
+    Comment.objects.bulk_create(comments, batch_size=500)
+    if comments and comments[0].pk is None:
+        # SQLite не возвращает id вставленных строк; под блокировкой
+        # записи наши строки — последние в таблице.
+        ids = Comment.objects.order_by('-pk').values_list(
+            'pk', flat=True)[:len(comments)]
+        for comment, pk in zip(comments, reversed(list(ids))):
+            comment.pk = pk
+    return comments
+
+
+def _insert_follows(records, users):
+    pairs = {(record['user'], record['author']) for record in records
+             if record['user'] in users and record['author'] in users
+             and record['user'] != record['author']}
+    if not pairs:
+        return []
+    existing = Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        author_id__in={author_id for _, author_id in pairs})
+    pairs -= set(existing.values_list('user_id', 'author_id'))
+    follows = [Follow(user_id=user_id, author_id=author_id)
+               for user_id, author_id in pairs]
+    Follow.objects.bulk_create(follows, batch_size=500)
+    ids = {(user_id, author_id): pk for pk, user_id, author_id in
+           existing.values_list('pk', 'user_id', 'author_id')}
+    for follow in follows:
+        follow.pk = ids[follow.user_id, follow.author_id]
+    return follows
+
+
+def start():
+    """
+    Запуск воркера: переигрывает журнал и запускает фоновый сброс.
+    """
+    if settings.WRITE_BEHIND:
+        with _lock:
+            _start()
+
+
+def _start():
+    global _started
+    if _started:
+        return
+    _started = True
+    try:
+        replay()
+    except Exception:
+        logger.exception('Не удалось переиграть журнал отложенной записи')
+    threading.Thread(target=_run, name='write-behind', daemon=True).start()
+
+
+def _run():
+    while True:
+        time.sleep(settings.WRITE_BEHIND_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать отложенную очередь')
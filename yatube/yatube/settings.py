@@ -49,6 +49,7 @@ LOGIN_REDIRECT_URL = 'index'
 INSTALLED_APPS = [
     'about',
     'users',
+    'api',
     'posts.apps.PostsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -57,29 +58,45 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'core',
+    'core.apps.CoreConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
+# В рабочем режиме шаблоны компилируются один раз: кэширующий
+# загрузчик держит их в памяти, а core.apps прогревает его при запуске
+TEMPLATE_CACHE = not DEBUG
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -101,9 +118,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами; перед запросом его
+        # проверяет core.sqlite.check_connections
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Прагмы каждого нового соединения SQLite, см. core.sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КБ, а не в страницах
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики для чтения: алиас из DATABASES -> вес при выборе.
+# После записи пользователь REPLICA_PIN_SECONDS читает из основной базы.
+DATABASE_REPLICAS = {}
+REPLICA_PIN_SECONDS = 5
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -124,6 +161,106 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+
+# Ленты index и group отдаются потоком: шапка страницы сразу, затем
+# карточки. Выключено по умолчанию: тесты читают response.context.
+# Atom-выгрузка читает посты пачками по STREAM_CHUNK_SIZE
+STREAM_FEEDS = False
+STREAM_CHUNK_SIZE = 200
+
+# Ленты Atom/RSS хранятся в кэше готовыми и удаляются сигналами;
+# время жизни ограничивает устаревание после правки группы или автора
+FEED_ITEMS = 20
+FEED_TIMEOUT = 60 * 60
+
+# Размер страницы списков JSON API
+API_PAGE_SIZE = 20
+
+# Лента подписок: при таком числе подписчиков посты автора
+# не раскладываются по лентам, а подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Id постов первой страницы группы; запись удаляется сигналами,
+# когда пост приходит в группу или уходит из неё
+GROUP_PAGE_TIMEOUT = 60 * 60 * 24
+
+# Лента обсуждаемого: вес комментария падает вдвое за HOT_HALF_LIFE
+# секунд; посты с рейтингом меньше e^-HOT_CUTOFF от свежего
+# комментария удаляются из таблицы
+HOT_HALF_LIFE = 6 * 60 * 60
+HOT_CUTOFF = 10
+HOT_POSTS = 20
+# Комментарии копятся в памяти процесса и записываются в рейтинг
+# пачкой: раз в HOT_FLUSH_SECONDS или при HOT_BUFFER_SIZE постах
+HOT_BUFFER_SIZE = 100
+HOT_FLUSH_SECONDS = 10
+HOT_PAGE_TIMEOUT = 60
+
+# Отложенная запись комментариев и подписок: ответ уходит после
+# записи в журнал WRITE_BEHIND_DIR, а в базу строки попадают пачкой
+# раз в WRITE_BEHIND_INTERVAL секунд или при WRITE_BEHIND_BATCH_SIZE
+# строках в очереди процесса
+WRITE_BEHIND = False
+WRITE_BEHIND_DIR = os.path.join(BASE_DIR, 'journal')
+WRITE_BEHIND_INTERVAL = 0.2
+WRITE_BEHIND_BATCH_SIZE = 500
+
+# Время жизни кэша карточки поста; устаревшие карточки отсекаются
+# метками версий, так что время можно держать большим
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры картинок постов строятся в фоновых потоках;
+# 0 — строить сразу в запросе
+POST_THUMBNAIL_SIZE = (960, 339)
+THUMBNAIL_WORKERS = 2
+# Сторона превью, которое встраивается в карточку data URI, пока
+# грузится миниатюра
+IMAGE_PREVIEW_SIZE = 16
+
+# Бюджет SQL-запросов на страницу (по имени URL)
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_STRICT = False
+QUERY_REPEAT_THRESHOLD = 3
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_posts': 5,
+    'profile': 6,
+    'post': 6,
+    'post_comments': 4,
+    'follow_index': 5,
+    'new_post': 3,
+    'post_edit': 4,
+    'search': 4,
+    'hot': 4,
+    'index_feed': 3,
+    'group_feed': 4,
+    'author_feed': 4,
+    'post_list': 3,
+    'post_detail': 3,
+    'comment_list': 4,
+    'group_list': 3,
+    'follow_list': 3,
+}
+
+# Профилирование запросов: заголовок X-Profile с токеном, ?profile=1
+# для сотрудников или случайная доля запросов
+PROFILER_TOKEN = None
+PROFILER_SAMPLE_RATE = 0
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Метрики /metrics: каждый воркер раз в METRICS_FLUSH_SECONDS пишет
+# свои значения в METRICS_DIR; None — только метрики текущего процесса
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_SECONDS = 5
+# Кто видит /metrics: запросы с заголовком Authorization: Bearer
+# METRICS_TOKEN и сотрудники. Адреса METRICS_ALLOWED_IPS пускаются без
+# токена, только если REMOTE_ADDR — адрес самого сборщика: за обратным
+# прокси у всех запросов там 127.0.0.1
+METRICS_ALLOWED_IPS = ()
+METRICS_TOKEN = None
 
 
 # Internationalization
@@ -151,8 +288,14 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'staticfiles'), ]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех воркеров кэш в файле SQLite. Если файл недоступен,
+# кэш работает в памяти процесса, как LocMemCache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
@@ -0,0 +1,26 @@
+"""
+Настройки тестов: manage.py test подставляет их сам, pytest берёт
+из pytest.ini.
+
+Тесты не должны трогать общий кэш и метрики живых воркеров хоста:
+прогону достаётся свой временный каталог.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+CACHES = dict(CACHES, default=dict(
+    CACHES['default'],
+    LOCATION=os.path.join(SCRATCH_DIR, 'cache', 'cache.sqlite3')))
+METRICS_DIR = os.path.join(SCRATCH_DIR, 'metrics')
+
+# Миниатюры строятся сразу: фоновая задача, пережившая тест, пишет
+# во временный MEDIA_ROOT, который тест уже удаляет.
+THUMBNAIL_WORKERS = 0
@@ -19,6 +19,8 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 handler404 = 'yatube.views.page_not_found'      # noqa
 handler500 = 'yatube.views.server_error'        # noqa
 
@@ -26,6 +28,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
+    path('api/v1/', include('api.urls', namespace='api')),
     path("", include("posts.urls")),
     path('about/', include('about.urls', namespace='about')),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Сегменты отложенной записи упавших воркеров применяются до первого
+# запроса: пользователю уже ответили, что комментарий сохранён.
+from posts import writebehind  # noqa: E402
+
+writebehind.start()